@@ -1,16 +1,59 @@
-from seleniumbase import Driver
 from selenium.common.exceptions import TimeoutException
 from datetime import date
 from Helpers import HandyWrappers
-import pandas as pd
+from Timing import timed, timer
+import threading
 import logging
+import sys
 import time
 import json
 import os
 
+# Inquiry outcomes in priority order; DEAD and ID ERROR win over FOUND when several are on the page
+OUTCOME_LOCATORS = {
+    'DEAD': "(//span[span[normalize-space(text())='DOD:']]/text()[normalize-space()])[3]//parent::span",
+    'ID ERROR': "//h4[@class='alert-heading']/parent::div//p[contains(normalize-space(.), 'The beneficiary you requested cannot be found. Please verify your information.')]",
+    'FOUND': '//li[@aria-controls="eligibility"]//a[.="Eligibility"]',
+}
+
+# Beneficiary result page tabs: the link that opens each tab and an element showing it has rendered
+RESULT_TABS = {
+    'Eligibility': {'link': '//li[@aria-controls="eligibility"]//a[.="Eligibility"]',
+                    'ready': '(//h3[normalize-space(text())="MDPP Inactive Periods"])[1]'},
+    'Plan Coverage': {'link': '//li[@aria-controls="PalnCoverage"]//a[.="Plan Coverage"]',
+                      'ready': '(//h3[.="Medicare Part D"])[1]'},
+    'MSP': {'link': '//li[@aria-controls="MSP"]//a[.="MSP"]',
+            'ready': '(//h3[normalize-space(text()) ="Medicare Secondary Payer"])[1]'},
+}
+
+# Field catalog: field name -> (tab, XPath) for everything read off the result page
+RESULT_FIELDS = {
+    'inactive_period': ('Eligibility', '((//h3[normalize-space(text())="MDPP Inactive Periods"])[1]//ancestor::div[@aria-describedby="mdppinactive"]//div[@class="row margin"]//div)[2]'),
+    'address': ('Eligibility', '((//h3[.="Beneficiary Address"])[1]//ancestor::div[@aria-describedby="beneaddressEliggFields"]//div[@class="row margin"]//div)[2]'),
+    'city': ('Eligibility', '((//h3[.="Beneficiary Address"])[1]//ancestor::div[@aria-describedby="beneaddressEliggFields"]//div[@class="row margin"]//div)[6]'),
+    'state': ('Eligibility', '((//h3[.="Beneficiary Address"])[1]//ancestor::div[@aria-describedby="beneaddressEliggFields"]//div[@class="row margin"]//div)[8]'),
+    'zip_code': ('Eligibility', '((//h3[.="Beneficiary Address"])[1]//ancestor::div[@aria-describedby="beneaddressEliggFields"]//div[@class="row margin"]//div)[10]'),
+    'insurance_name': ('Plan Coverage', '(((//div[@id="medicarepartDPlanCoverageFields"])[1]//div[@class="row margin"])[2]//span)[4]'),
+    'plan_type': ('Plan Coverage', '((//p[.="Plan Type:"])[1]//ancestor::div[@class="row margin"]//div)[2]'),
+    'msp_insurer_name': ('MSP', '((//h3[normalize-space(text()) ="Medicare Secondary Payer"])[1]//ancestor::div[@aria-describedby="medicaresecondarypayermspFields"]//div[@class="row margin"]//div)[6]'),
+}
+
+def classify_eligibility(inactive_period, plan_type, msp_insurer_name):
+    """Eligibility of a found beneficiary, shared by the browser and HTTP paths"""
+    if inactive_period:
+        return 'INACTIVE PART B'
+    if plan_type:
+        return plan_type
+    return 'MSP' if msp_insurer_name else 'MED B'
+
 class AutomationBot:
     HW = HandyWrappers()
+    # Workers log in concurrently; only one of them should prompt for the day's access code
+    _login_code_lock = threading.Lock()
+    # Access code from the environment or credentials file, tried before prompting
+    access_code = None
 
+    @timed('loading_URL')
     def loading_URL(self, driver, url, timeout=100):
         """Open a URL with error handling."""
         try:
@@ -19,19 +62,29 @@ class AutomationBot:
                 # Check if URL is loaded correctly or not to break the loop
                 if self.HW.element_exists(driver, 5, '//input[@name="userId"]'):
                     break
+                # A page-load cap rather than an implicit wait, which would stretch every explicit wait's probes
+                driver.set_page_load_timeout(timeout)
                 driver.get(url)
-                driver.implicitly_wait(timeout)
         except TimeoutException:
             logging.error('-----------------------PAGE LOAD TIMED OUT!-----------------------')
             print("The page took too long to load. Please try again.")
 
-    def portal_login(self, eservices_url, headless, username, password):
+    def launch_driver(self, headless, profile=None):
+        """Start Chrome, using the launch profile's settings when one is given"""
+        if profile is None:
+            from seleniumbase import Driver
+            return Driver(uc=True, headless=headless)
+        return profile.launch()
+
+    def portal_login(self, eservices_url, headless, username, password, profile=None):
         """Log into eServices"""
         logging.info("--------------- Starting new browser session ---------------")
-        driver = Driver(uc=True, headless=headless)
+        driver = self.launch_driver(headless, profile)
+        timer.lap('login.browser_start')
 
         logging.info(f"Accessing -----------------------------> {eservices_url}")
         self.loading_URL(driver, eservices_url, timeout=30)
+        timer.lap('login.load_page')
 
         try:
             for attempt in range(5):
@@ -55,19 +108,98 @@ class AutomationBot:
                 else:
                     break
 
+            timer.lap('login.credentials')
+
             # --- Login code handling ---
             logging.info('Getting Login code and/or saving in json for later.')
             self.get_valid_login_code(driver)
+            timer.lap('login.access_code')
             # Handling dialog box
             logging.info('Checking for dialog box...')
             self.HW.click_element(driver, 100, '//button[.="I ACKNOWLEDGE"]')
+            timer.lap('login.acknowledge')
             logging.info('Login completed successfully.')
             return driver
         except Exception as e: 
             logging.error(f"Login failed: {e}")
             
+    def start_session(self, eservices_url, headless, username, password, session_file=None, profile=None):
+        """Resume a saved session if it is still valid, otherwise do a full login and save it"""
+        driver = self.resume_session(eservices_url, headless, session_file, profile=profile) if session_file else None
+        timer.lap('login.resume_session')
+        if driver is None:
+            driver = self.portal_login(eservices_url, headless, username, password, profile)
+            if driver and session_file:
+                self.save_session_state(driver, session_file)
+        return driver
+
+    def save_session_state(self, driver, session_file):
+        """Persist the authenticated cookies and local storage so a restarted driver can skip login"""
+        try:
+            state = {'saved_at': time.time(), 'url': driver.current_url, 'cookies': driver.get_cookies(),
+                     'local_storage': driver.execute_script("return Object.assign({}, window.localStorage);")}
+            with open(session_file, 'w') as f:
+                json.dump(state, f)
+            logging.info(f'Session state saved to {session_file}.')
+        except Exception as e:
+            logging.warning(f"Could not save session state: {e}")
+
+    def resume_session(self, eservices_url, headless, session_file, max_state_age=8 * 3600, profile=None):
+        """Start a driver from saved session state, or return None if there is no usable session"""
+        if not os.path.exists(session_file):
+            return None
+        try:
+            with open(session_file, 'r') as f:
+                state = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            logging.warning("Error reading session state file. Logging in fresh.")
+            return None
+        if time.time() - state.get('saved_at', 0) > max_state_age:
+            logging.info('Saved session is too old. Logging in fresh.')
+            self.discard_session_state(session_file)
+            return None
+
+        logging.info("--------------- Resuming saved browser session ---------------")
+        driver = self.launch_driver(headless, profile)
+        try:
+            # Cookies can only be set once the browser is on the portal's domain
+            driver.get(eservices_url)
+            now = time.time()
+            for cookie in state.get('cookies', []):
+                if cookie.get('expiry') and cookie['expiry'] < now:
+                    continue
+                try:
+                    driver.add_cookie(cookie)
+                except Exception as e:
+                    logging.warning(f"Skipping cookie {cookie.get('name')}: {e}")
+            driver.execute_script("for (const [k, v] of Object.entries(arguments[0])) { localStorage.setItem(k, v); }",
+                                  state.get('local_storage', {}))
+            driver.get(state.get('url') or eservices_url)
+
+            if self.HW.element_exists(driver, 15, "//a[.='Eligibility' and @id='eligibilityTab']"):
+                if self.HW.element_exists(driver, 3, '//button[.="I ACKNOWLEDGE"]'):
+                    self.HW.click_element(driver, 10, '//button[.="I ACKNOWLEDGE"]')
+                logging.info('Saved session resumed without logging in.')
+                return driver
+            logging.info('Saved session is no longer valid. Logging in fresh.')
+        except Exception as e:
+            logging.warning(f"Could not resume saved session: {e}")
+
+        driver.quit()
+        self.discard_session_state(session_file)
+        return None
+
+    def discard_session_state(self, session_file):
+        if session_file and os.path.exists(session_file):
+            os.remove(session_file)
+
     def get_valid_login_code(self, driver):
         """Prompt for and return a valid login code for today, reusing if already saved"""
+        # Later workers wait here and pick up the code the first one saved to login_code.json
+        with AutomationBot._login_code_lock:
+            self._enter_login_code(driver)
+
+    def _enter_login_code(self, driver):
         code_file = "login_code.json"
         # Load saved code and date from file if it exists
         saved_code, saved_date = None, None
@@ -84,11 +216,16 @@ class AutomationBot:
 
         today = date.today()
         if saved_date != today: saved_code = None
+        offered_code = self.access_code
 
         while True:
             if saved_code is None:
+                if offered_code is None and not (sys.stdin is not None and sys.stdin.isatty()):
+                    # Unattended runs fail this login instead of waiting on a prompt nobody will answer
+                    raise RuntimeError("No valid access code for today; set ESERVICES_ACCESS_CODE or access_code in the credentials file.")
                 try:
-                    saved_code = int(input('Enter login code: '))
+                    code, offered_code = offered_code if offered_code is not None else input('Enter login code: '), None
+                    saved_code = int(code)
                     # Save the code and date to file
                     with open(code_file, 'w') as f:
                         json.dump({'code': saved_code, 'date': today.isoformat()}, f)
@@ -104,6 +241,9 @@ class AutomationBot:
             try:
                 if self.HW.element_exists(driver, 5, '//span[contains(normalize-space(text()), "The verification code entered does not match")]'):
                     logging.warning('Invalid login code entered. Please try again.')
+                    # A configured code that the portal rejects is not offered to later logins
+                    if self.access_code is not None and str(saved_code) == str(self.access_code).strip():
+                        self.access_code = None
                     saved_code = None
                     # Remove invalid code from file
                     if os.path.exists(code_file):
@@ -114,38 +254,61 @@ class AutomationBot:
             except Exception as e:
                 logging.error(f"Error in login code: {e}")
     
-    def Automation(self, driver, medicare_id, input_data_filename, output_data_filename):
+    def read_result_tab(self, driver, tab):
+        """Open a result tab and read all of its catalog fields in one script call"""
+        with timer.span(f'tab.{tab}'):
+            self.HW.click_element(driver, 20, RESULT_TABS[tab]['link'])
+            self.HW.scroll_to_element(driver, 30, RESULT_TABS[tab]['ready'])
+            return self.HW.extract_fields(driver, {field: xpath for field, (field_tab, xpath) in RESULT_FIELDS.items()
+                                                   if field_tab == tab})
+
+    def Automation(self, driver, medicare_id, input_data_filename, result_writer):
+        # Name is pre-split and DOB pre-formatted in the patient index
+        patient = self.HW.get_patient(medicare_id, input_data_filename)
+        self.submit_inquiry(driver, medicare_id, patient)
+
+        # Check if DOD or Beneficiary exists
+        logging.info('Checking beneficiary status...')
+        logging.info("Checking Medicare ID and it's DOD Exists or Not...")
+        # Watch every outcome at once (see OUTCOME_LOCATORS)
+        outcome = self.HW.wait_for_any(driver, 30, OUTCOME_LOCATORS)
+        timer.lap('automation.submit_wait')
+        self.collect_result(driver, medicare_id, patient, outcome, result_writer)
+
+    def submit_inquiry(self, driver, medicare_id, patient):
+        """Fill the eligibility form with one patient's data and submit it"""
         self.HW.click_element(driver, 30, "//a[.='Eligibility' and @id='eligibilityTab']")
         self.HW.scroll_to_element(driver, 10, "//h3[.='Beneficiary Information']") 
-
-        name, dob = self.HW.get_info_by_medicare_id(medicare_id, input_data_filename)
-        # Extract and sanitize name
-        full_name = name.strip().split()
-        first_name = full_name[0]
-        last_name = full_name[-1] if len(full_name) > 1 else ''
+        first_name, last_name = patient['first_name'], patient['last_name']
+        timer.lap('automation.open_form')
 
         logging.info('--------- INITIATING Automation PROCESS ---------')
         logging.info('Filling form with patient data...')
         self.HW.input_text(driver, 30, '//input[@name="beneficiaryLastName"]', last_name)
         self.HW.input_text(driver, 30, '//input[@name="beneficiaryFirstName"]', first_name)
         self.HW.input_text(driver, 30, '//input[@name="hicNumber"]', medicare_id)
-        self.HW.date_input(driver, 30, '//input[@name="beneficiaryDateOfBirth"]', dob)
+        self.HW.date_input(driver, 30, '//input[@name="beneficiaryDateOfBirth"]', patient['dob'])
+        timer.lap('automation.fill_form')
         self.HW.scroll_to_element(driver, 20, '//button[.="Submit"]')    
         self.HW.click_element(driver, 20, '//button[.="Submit"]')
-        time.sleep(1.5)
-        self.HW.scroll_to_element(driver, 50, "//a[.='Eligibility' and @id='eligibilityTab']")  
+
+    def collect_result(self, driver, medicare_id, patient, outcome, result_writer):
+        """Read the result page for the detected outcome, store the row and reset the form"""
+        # No outcome means the page never rendered (or is an error page); reading it would yield a bogus MED B row
+        if outcome is None:
+            raise TimeoutException(f"None of {list(OUTCOME_LOCATORS)} appeared for MEDICARE ID {medicare_id}")
+        name, dob = patient['name'], patient['dob']
         eligibility = ''         
 
         try:
-            # Check if DOD or Beneficiary exists
-            logging.info('Checking beneficiary status...')
-            logging.info("Checking Medicare ID and it's DOD Exists or Not...")
-            if self.HW.element_exists(driver, 5, "(//span[span[normalize-space(text())='DOD:']]/text()[normalize-space()])[3]//parent::span"):
+            self.HW.scroll_to_element(driver, 10, "//a[.='Eligibility' and @id='eligibilityTab']")
+
+            if outcome == 'DEAD':
                 eligibility = 'DEAD'
                 insurance_name = address = city = state = zip_code = ''
                 logging.info(f"The requested Medicare ID's DOD is Dead. So, Eligibility = '{eligibility}'")
 
-            elif self.HW.element_exists(driver, 5, "//h4[@class='alert-heading']/parent::div//p[contains(normalize-space(.), 'The beneficiary you requested cannot be found. Please verify your information.')]"):
+            elif outcome == 'ID ERROR':
                 eligibility = 'ID ERROR'
                 insurance_name = address = city = state = zip_code = ''
                 logging.info(f"The beneficiary you requested cannot be found. So, Eligibility = '{eligibility}'")
@@ -153,82 +316,53 @@ class AutomationBot:
             else:
                 # If beneficiary exists, extract details
                 logging.info('Extracting detailed information...')
-                self.HW.click_element(driver, 20, '//li[@aria-controls="eligibility"]//a[.="Eligibility"]')
-                self.HW.scroll_to_element(driver, 30, '(//h3[normalize-space(text())="MDPP Inactive Periods"])[1]')
-
-                # Check inactive period
-                logging.info("Checking Medicare ID's Inactive Period Exists or Not...")
-                try: 
-                    inactive_period = self.HW.get_text(driver, 30, '((//h3[normalize-space(text())="MDPP Inactive Periods"])[1]//ancestor::div[@aria-describedby="mdppinactive"]//div[@class="row margin"]//div)[2]')
-                    inactive_period = inactive_period.strip() if inactive_period else ''
-                except Exception as e: 
-                    print("Error:", e)
-                    inactive_period = ''
+                eligibility_tab = self.read_result_tab(driver, 'Eligibility')
+                inactive_period, address = eligibility_tab['inactive_period'], eligibility_tab['address']
+                city, state, zip_code = eligibility_tab['city'], eligibility_tab['state'], eligibility_tab['zip_code']
+                logging.info('Got *****Inactive Period, Address, City, State, Zipcode*****')
 
                 if inactive_period: 
-                    eligibility = 'INACTIVE PART B'
-                    logging.info(f"The Medicare ID's Inactive Period exists. So, Eligibility = '{eligibility}'")
-
-                # Get Address Info
-                logging.info('Getting Beneficiary Address Info...')
-                address = self.HW._get_text_safe(driver, '((//h3[.="Beneficiary Address"])[1]//ancestor::div[@aria-describedby="beneaddressEliggFields"]//div[@class="row margin"]//div)[2]')
-                city = self.HW._get_text_safe(driver, '((//h3[.="Beneficiary Address"])[1]//ancestor::div[@aria-describedby="beneaddressEliggFields"]//div[@class="row margin"]//div)[6]')
-                state = self.HW._get_text_safe(driver, '((//h3[.="Beneficiary Address"])[1]//ancestor::div[@aria-describedby="beneaddressEliggFields"]//div[@class="row margin"]//div)[8]')
-                zip_code = self.HW._get_text_safe(driver, '((//h3[.="Beneficiary Address"])[1]//ancestor::div[@aria-describedby="beneaddressEliggFields"]//div[@class="row margin"]//div)[10]')
-                logging.info('Got *****Address, City, State, Zipcode*****')
+                    logging.info("The Medicare ID's Inactive Period exists. So, Eligibility = 'INACTIVE PART B'")
 
                 # Insurance info
                 logging.info('Getting Insurance Info...')
-                self.HW.click_element(driver, 20, '//li[@aria-controls="PalnCoverage"]//a[.="Plan Coverage"]')
-                self.HW.scroll_to_element(driver, 30, '(//h3[.="Medicare Part D"])[1]')
-                insurance_name = self.HW._get_text_safe(driver, '(((//div[@id="medicarepartDPlanCoverageFields"])[1]//div[@class="row margin"])[2]//span)[4]')
-                logging.info('Got *****Insurance Name*****')
+                plan_coverage_tab = self.read_result_tab(driver, 'Plan Coverage')
+                insurance_name, plan_type = plan_coverage_tab['insurance_name'], plan_coverage_tab['plan_type']
+                logging.info('Got *****Insurance Name, Plan Type*****')
 
                 # Determine final eligibility
                 logging.info('Determine final eligibility value if not obtained from above values...')
                 driver.execute_script("window.scrollTo(0, 0);")
-                if eligibility != 'INACTIVE PART B':
-                    try:
-                        logging.info('Checking Plan Type...')
-                        try: 
-                            plan_type = self.HW.get_text(driver, 30, '((//p[.="Plan Type:"])[1]//ancestor::div[@class="row margin"]//div)[2]')
-                            plan_type = plan_type.strip() if plan_type else ''
-                        except Exception as e: 
-                            print("Error:", e)
-                            plan_type = ''
-
-                        if plan_type: 
-                            eligibility = plan_type
-                            logging.info('Got *****Eligibility***** from plan type')
-                        else:
-                            logging.info('Checking MSP because Plan Type does not exists...')
-                            self.HW.click_element(driver, 20, '//li[@aria-controls="MSP"]//a[.="MSP"]')
-                            try: 
-                                msp_insurer_name = self.HW._get_text_safe(driver, '((//h3[normalize-space(text()) ="Medicare Secondary Payer"])[1]//ancestor::div[@aria-describedby="medicaresecondarypayermspFields"]//div[@class="row margin"]//div)[6]')
-                                msp_insurer_name = msp_insurer_name.strip() if msp_insurer_name else ''
-                            except Exception as e: 
-                                print("Error:", e)
-                                msp_insurer_name = ''
-
-                            eligibility = "MSP" if msp_insurer_name else 'MED B'
-                            logging.info('Got *****Eligibility*****')
-                    except:
-                        eligibility = 'UNKNOWN'
-                        logging.info(f"Nothing worked so Eligibility = '{eligibility}'")
+                try:
+                    # The MSP tab is only opened when neither the inactive period nor the plan type decides it
+                    msp_insurer_name = ''
+                    if not inactive_period and not plan_type:
+                        logging.info('Checking MSP because Plan Type does not exists...')
+                        msp_insurer_name = self.read_result_tab(driver, 'MSP')['msp_insurer_name']
+                    eligibility = classify_eligibility(inactive_period, plan_type, msp_insurer_name)
+                    logging.info('Got *****Eligibility*****')
+                except:
+                    eligibility = 'UNKNOWN'
+                    logging.info(f"Nothing worked so Eligibility = '{eligibility}'")
 
                 logging.info(f'Eligibility: {eligibility}, Insurance: {insurance_name}, Address: {address}, City: {city}, State: {state}, ZIP: {zip_code}')
+            timer.lap('automation.result_tabs')
 
             # Prepare row data
             logging.info('Preparing the Row Data')
-            row_df = pd.DataFrame([{'ELIGIBILITY': eligibility, 'INSURANCE NAME': insurance_name,
-                                    'NAME': name, 'MEDICARE ID': medicare_id, 'DOB': dob, 'ADDRESS': address, 
-                                    'CITY': city, 'STATE': state, 'ZIP': zip_code}])
+            row = {'ELIGIBILITY': eligibility, 'INSURANCE NAME': insurance_name,
+                   'NAME': name, 'MEDICARE ID': medicare_id, 'DOB': dob, 'ADDRESS': address, 
+                   'CITY': city, 'STATE': state, 'ZIP': zip_code}
 
+            # Journaled immediately, written to the xlsx in batches by the ResultWriter
             logging.info('Storing the Row Data')
-            with pd.ExcelWriter(output_data_filename, mode='a', engine='openpyxl', if_sheet_exists='overlay') as writer:
-                row_df.to_excel(writer, index=False, header=False, startrow=writer.sheets['Sheet1'].max_row)
+            result_writer.write(row)
+            timer.lap('automation.store_row')
             
             self.HW.click_element(driver, 20, '//a[.="Inquiry"]//parent::li')
+            timer.lap('automation.reset_inquiry')
         
-        except: 
-            print(f"Failed to fetch data for {medicare_id}")               
+        except Exception as e: 
+            # Re-raised so the worker records the failure in the job ledger for a later retry
+            logging.error(f"Failed to fetch data for {medicare_id}: {e}")
+            raise               
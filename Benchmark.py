@@ -0,0 +1,151 @@
+from MockPortal import MockPortal, expected_eligibility
+from openpyxl import Workbook, load_workbook
+from datetime import date, timedelta
+from main import Main
+from Timing import timer
+import statistics
+import tempfile
+import threading
+import argparse
+import logging
+import json
+import time
+import os
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+    import resource
+
+
+class PeakRSS:
+    """Sample the resident memory of this process and its browsers; psutil is optional."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        if psutil:
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        if psutil:
+            self.thread.join()
+        else:
+            # Without psutil: this process plus the largest finished child (ru_maxrss is KB on Linux)
+            self.peak_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                            + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+
+    def _sample(self):
+        process = psutil.Process()
+        while not self.stopped.is_set():
+            total = 0
+            for proc in [process] + process.children(recursive=True):
+                try:
+                    total += proc.memory_info().rss
+                except psutil.Error:
+                    continue
+            self.peak_mb = max(self.peak_mb, total / (1024 * 1024))
+            self.stopped.wait(self.interval)
+
+
+def write_tracking_sheet(path, rows):
+    """Write a synthetic Tracking_IDs sheet with MEDICARE ID, NAME and DOB columns."""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['MEDICARE ID', 'NAME', 'DOB'])
+    for i in range(rows):
+        dob = date(1940, 1, 1) + timedelta(days=(i * 37) % 15000)
+        sheet.append([f"BENCH{i:07d}", f"FIRST{i} LAST{i}", dob.strftime("%m/%d/%Y")])
+    workbook.save(path)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+def run_once(rows, workers, http_fast_path, portal_options, tabs=1, lean=True):
+    """Run Main.main headless against a fresh mock portal over a synthetic sheet of `rows` IDs."""
+    portal = MockPortal(**portal_options).start()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='eservices-bench-') as workdir:
+        # login_code.json and session files are read from the working directory
+        os.chdir(workdir)
+        try:
+            with open('login_code.json', 'w') as f:
+                json.dump({'code': int(portal.access_code), 'date': date.today().isoformat()}, f)
+            input_data_filename = os.path.join(workdir, 'Tracking_IDs.xlsx')
+            output_data_filename = os.path.join(workdir, 'ELG_DATA_Output.xlsx')
+            write_tracking_sheet(input_data_filename, rows)
+
+            timer.reset()
+            with PeakRSS() as rss:
+                summary = Main().main(headless=True, workers=workers, tabs=tabs, http_fast_path=http_fast_path, lean=lean,
+                                      eservices_url=portal.url, username=portal.username, password=portal.password,
+                                      input_data_filename=input_data_filename, output_data_filename=output_data_filename)
+
+            sheet = load_workbook(output_data_filename, read_only=True).active
+            output = list(sheet.iter_rows(min_row=2, values_only=True))
+            correct = sum(1 for row in output if row[0] == expected_eligibility(row[3]))
+        finally:
+            os.chdir(cwd)
+            portal.stop()
+
+    id_seconds = summary['id_seconds']
+    page_loads = timer.step_seconds.get('login.load_page', []) + timer.step_seconds.get('automation.open_form', [])
+    return {'rows': rows, 'workers': workers, 'http_fast_path': http_fast_path, 'lean': lean,
+            'page_load_p50_seconds': percentile(sorted(page_loads), 50),
+            'rss_per_worker_mb': rss.peak_mb / workers,
+            'scraped': summary['scraped'], 'written': len(output), 'correct': correct,
+            'ids_per_minute': summary['scraped'] / summary['seconds'] * 60 if summary['seconds'] else 0.0,
+            'p50_seconds': percentile(id_seconds, 50), 'p95_seconds': percentile(id_seconds, 95),
+            'peak_rss_mb': rss.peak_mb}
+
+
+def print_report(results):
+    header = (f"{'rows':>7} {'workers':>7} {'http':>5} {'lean':>5} {'written':>8} {'correct':>8} {'IDs/min':>9} {'p50 s':>7} "
+              f"{'p95 s':>7} {'load p50 s':>10} {'peak RSS MB':>12} {'MB/worker':>10}")
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['rows']:>7} {r['workers']:>7} {str(r['http_fast_path']):>5} {str(r['lean']):>5} {r['written']:>8} "
+              f"{r['correct']:>8} {r['ids_per_minute']:>9.1f} {r['p50_seconds']:>7.2f} {r['p95_seconds']:>7.2f} "
+              f"{r['page_load_p50_seconds']:>10.2f} {r['peak_rss_mb']:>12.0f} {r['rss_per_worker_mb']:>10.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='End-to-end throughput benchmark against the mock eServices portal.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000], help='synthetic sheet sizes')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--tabs', type=int, default=1, help='inquiries pipelined per worker, one per tab')
+    parser.add_argument('--http-fast-path', action='store_true')
+    parser.add_argument('--compare-profiles', action='store_true',
+                        help='run every size with the default and the lean browser profile')
+    parser.add_argument('--no-lean', action='store_true', help='use the default browser profile')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the mock adds to every request')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of inquiries failing with HTTP 500')
+    parser.add_argument('--session-ttl', type=float, default=None, help='seconds before a mock login expires')
+    parser.add_argument('--json', help='also write the results to this JSON file')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    portal_options = {'latency': args.latency, 'jitter': args.jitter, 'failure_rate': args.failure_rate,
+                      'session_ttl': args.session_ttl, 'seed': 0}
+    profiles = [False, True] if args.compare_profiles else [not args.no_lean]
+    results = [run_once(rows, args.workers, args.http_fast_path, portal_options, args.tabs, lean)
+               for rows in args.sizes for lean in profiles]
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
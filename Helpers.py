@@ -3,40 +3,105 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from datetime import datetime, timedelta
+from datetime import datetime
+from ResultWriter import OUTPUT_HEADERS
+from Timing import timed, timer
+from WaitPolicy import wait_policy
+from itertools import islice
+import time
 import os
-import pandas as pd
+import csv
 import logging
+# pandas and openpyxl are imported inside the methods that use them; at module level they dominate startup time
 
 class HandyWrappers:
+    # Input sheets parsed once per run, shared by every HandyWrappers instance
+    _patient_indexes = {}
+    # Date format detected for each (file, column) of string dates
+    _dob_formats = {}
+    DOB_FORMATS = ("%m/%d/%Y", "%Y-%m-%d", "%d/%m/%Y", "%m-%d-%Y", "%d-%m-%Y", "%Y-%m-%d %H:%M:%S")
+
     # Check if an element exists
+    @timed('hw.element_exists')
     def element_exists(self, driver, timeout, xpath):
         try:
-            WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.XPATH, xpath)))
+            self._wait(driver, timeout, xpath, EC.presence_of_element_located((By.XPATH, xpath)), adaptive=True)
             return True
         except TimeoutException: 
             return False
 
+    # Wait on a locator and record how long it took
+    def _wait(self, driver, timeout, locator, condition, poll_frequency=0.5, adaptive=False):
+        """Run WebDriverWait for condition.
+
+        adaptive waits are the ones where absence is a valid answer (element_exists, wait_for_any); they stop at the
+        locator's learned budget. Action helpers keep the call site's timeout, since they carry on after a timeout.
+        """
+        if adaptive:
+            deadline = wait_policy.budget(locator, timeout)
+        else:
+            wait_policy.check(locator)
+            deadline = timeout
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(driver, deadline, poll_frequency).until(condition)
+        except TimeoutException:
+            wait_policy.record_timeout(locator, deadline, timeout)
+            timer.timeout(locator)
+            raise
+        wait_policy.record_success(locator, time.monotonic() - started)
+        return result
+
+    # Check once, without waiting, which of several named elements is on the page
+    def first_present(self, driver, locators):
+        """Return the name of the first locator (in the given order) present right now, else None."""
+        names, xpaths = list(locators.keys()), list(locators.values())
+        # One script call checks every XPath and never sits on the driver's implicit wait
+        script = """
+            const xpaths = arguments[0];
+            for (let i = 0; i < xpaths.length; i++) {
+                if (document.evaluate(xpaths[i], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue) {
+                    return i;
+                }
+            }
+            return -1;"""
+        index = driver.execute_script(script, xpaths)
+        return names[index] if index >= 0 else None
+
+    # Wait for whichever of several named elements appears first
+    @timed('hw.wait_for_any')
+    def wait_for_any(self, driver, timeout, locators, poll_frequency=0.25):
+        """Return the name of the first locator (in the given order) present before the deadline, else None."""
+        try:
+            return self._wait(driver, timeout, ' | '.join(locators), lambda d: self.first_present(d, locators),
+                              poll_frequency, adaptive=True)
+        except TimeoutException:
+            logging.warning(f"None of {list(locators)} appeared within the wait budget (at most {timeout} s)")
+            return None
+
     # Click an element safely
+    @timed('hw.click_element')
     def click_element(self, driver, timeout, xpath):
         try:
-            WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.XPATH, xpath))).click()
+            self._wait(driver, timeout, xpath, EC.element_to_be_clickable((By.XPATH, xpath))).click()
         except TimeoutException:
             logging.warning(f"Element not clickable: {xpath}")
         
     # Input text into a field safely
+    @timed('hw.input_text')
     def input_text(self, driver, timeout, xpath, text):
         try:
-            element = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.XPATH, xpath)))
+            element = self._wait(driver, timeout, xpath, EC.element_to_be_clickable((By.XPATH, xpath)))
             element.clear()
             element.send_keys(text)
         except TimeoutException:
             logging.warning(f"Failed to input text in: {xpath}")
     
     # Retrieve text from an element safely
+    @timed('hw.get_text')
     def get_text(self, driver, timeout, xpath):
         try:
-            return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.XPATH, xpath))).text
+            return self._wait(driver, timeout, xpath, EC.presence_of_element_located((By.XPATH, xpath))).text
         except TimeoutException:
             logging.warning(f"Failed to retrieve text from: {xpath}")
             return None
@@ -49,97 +114,230 @@ class HandyWrappers:
             logging.warning(f"Failed to get text from {xpath}: {e}")
             return None
         
+    # Retrieve the text of several elements in a single round trip
+    @timed('hw.extract_fields')
+    def extract_fields(self, driver, locators):
+        """Return {name: text} for named XPaths; elements not on the page come back as '' at once."""
+        script = """
+            const result = {};
+            for (const [name, xpath] of Object.entries(arguments[0])) {
+                const node = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+                result[name] = node ? (node.innerText || node.textContent || '').trim() : '';
+            }
+            return result;"""
+        try:
+            return driver.execute_script(script, locators)
+        except Exception as e:
+            logging.warning(f"Failed to extract fields {list(locators)}: {e}")
+            return {name: '' for name in locators}
+
     # Scroll to an element using its XPath
+    @timed('hw.scroll_to_element')
     def scroll_to_element(self, driver, timeout, xpath):
         try:
-            element = WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.XPATH, xpath)))
+            element = self._wait(driver, timeout, xpath, EC.presence_of_element_located((By.XPATH, xpath)))
             driver.execute_script("arguments[0].scrollIntoView({ behavior: 'smooth', block: 'center' });", element)
         except TimeoutException:
             logging.warning(f"Failed to scroll to element: {xpath}")
 
     # calendar filling input method
+    @timed('hw.date_input')
     def date_input(self, driver, timeout, xpath, date_value):
-        WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.XPATH, xpath)))
-        calendar_input = driver.find_element(By.XPATH, xpath)
+        calendar_input = self._wait(driver, timeout, xpath, EC.element_to_be_clickable((By.XPATH, xpath)))
         calendar_input.click()
         calendar_input.send_keys(Keys.CONTROL, 'a')  # For Windows/Linux
         calendar_input.send_keys(date_value)
 
     # to create excel file for the output
     def xlsx_creator(self, file_path):
-        headers = ['ELIGIBILITY', 'INSURANCE NAME', 'NAME', 'MEDICARE ID', 
-                   'DOB', 'ADDRESS', 'CITY', 'STATE', 'ZIP']
-
+        """Return the set of MEDICARE IDs already in the output (read from that one column), creating the file if needed."""
         if os.path.exists(file_path):
             print("The file exists.")
-            df = pd.read_excel(file_path)
-            if 'MEDICARE ID' in df.columns:
-                medicare_ids = df['MEDICARE ID'].tolist()
-                print(f"Already Scraped MEDICARE IDs are: {medicare_ids}")
-                return medicare_ids
-            else:
+            try:
+                rows = self.iter_sheet_rows(file_path, ('MEDICARE ID',))
+            except ValueError:
                 print("Column 'MEDICARE ID' not found in the Excel file.")
                 return None
+            medicare_ids = {str(medicare_id) for _, (medicare_id,) in rows}
+            print(f"{len(medicare_ids)} MEDICARE IDs already scraped.")
+            return medicare_ids
         else:
             print("The file does not exist. Therefore, creating one.")
-            df = pd.DataFrame(columns=headers)
-            df.to_excel(file_path, index=False)
+            from openpyxl import Workbook
+            workbook = Workbook()
+            # Same sheet name as pandas (and ResultWriter) give a new output file
+            workbook.active.title = 'Sheet1'
+            workbook.active.append(OUTPUT_HEADERS)
+            workbook.save(file_path)
             return None
 
+    # Stream the named columns of an xlsx or CSV sheet without loading it whole
+    def iter_sheet_rows(self, filename, columns):
+        """Return an iterator of (row number, values) for non-blank rows; ValueError if a column is missing."""
+        if filename.lower().endswith('.csv'):
+            f = open(filename, newline='', encoding='utf-8-sig')
+            rows, close = csv.reader(f), f.close
+            # CSV cells are all strings; blank ones count as missing like empty Excel cells
+            clean = lambda value: value.strip() or None
+        else:
+            # Read-only mode parses rows as they are iterated instead of building the whole workbook
+            from openpyxl import load_workbook
+            workbook = load_workbook(filename, read_only=True, data_only=True)
+            rows, close = workbook.active.iter_rows(values_only=True), workbook.close
+            clean = lambda value: value
+
+        header = [str(value).strip() if value is not None else '' for value in next(rows, ())]
+        missing_columns = [col for col in columns if col not in header]
+        if missing_columns:
+            close()
+            raise ValueError(f"Column(s) {missing_columns} not found in {filename}.")
+        return self._stream_rows(rows, [header.index(col) for col in columns], clean, close)
+
+    def _stream_rows(self, rows, indexes, clean, close):
+        try:
+            for row_number, row in enumerate(rows, start=2):
+                values = tuple(clean(row[i]) if i < len(row) else None for i in indexes)
+                if any(value is not None for value in values):
+                    yield row_number, values
+        finally:
+            close()
+
     def excel_reader(self, input_data_filename):
+        # IDs come straight from the in-memory patient index so the sheet is parsed only once
+        patient_index = self.load_patient_index(input_data_filename)
+        return list(patient_index.keys())
+
+    # to load the input sheet once into a Medicare ID keyed index
+    def load_patient_index(self, input_data_filename):
+        """Return {medicare_id: {'name', 'first_name', 'last_name', 'dob'}}, building it on first use."""
+        if input_data_filename not in HandyWrappers._patient_indexes:
+            for _ in self.iter_patient_index(input_data_filename):
+                pass
+        return HandyWrappers._patient_indexes.get(input_data_filename, {})
+
+    # to index the input sheet batch by batch while it streams
+    def iter_patient_index(self, input_data_filename, batch_size=1000):
+        """Yield {medicare_id: patient} batches in input order; each is in the shared index before it is yielded."""
+        import pandas as pd
+        patient_index = {}
         try:
-            df = pd.read_excel(input_data_filename)
-            if 'MEDICARE ID' in df.columns:
-                return df['MEDICARE ID'].tolist()
-            else:
-                logging.error("'MEDICARE ID' column not found in the Excel file.")
-                return []
+            rows = self.iter_sheet_rows(input_data_filename, ('MEDICARE ID', 'NAME', 'DOB'))
         except Exception as e:
             logging.error(f"Error loading Medicare IDs: {e}")
-            return []
+            return
+        # get_patient sees the index grow, so workers can look up IDs while later rows are still being read
+        HandyWrappers._patient_indexes[input_data_filename] = patient_index
 
-    # to get name and DOB name of corresponding id    
-    def get_info_by_medicare_id(self, medicare_id, input_data_filename):
-        try:
-            df = pd.read_excel(input_data_filename)
-            if 'MEDICARE ID' not in df.columns:
-                logging.error("'MEDICARE ID' column not found in the Excel file.")
-                return None
+        report_filename = f"{os.path.splitext(input_data_filename)[0]}.rejects.csv"
+        if os.path.exists(report_filename):
+            os.remove(report_filename)
+        rejected = 0
+        for chunk in iter(lambda: list(islice(rows, batch_size)), []):
+            rejects = []
+            # Each batch's DOB column is normalized in one pass; None marks values no format could parse
+            dobs = self.normalize_dates(pd.Series([dob_raw for _, (_, _, dob_raw) in chunk], dtype=object),
+                                        cache_key=(input_data_filename, 'DOB'))
+            batch = {}
+            for (excel_row, (medicare_id, name, dob_raw)), dob in zip(chunk, dobs):
+                if pd.isna(medicare_id) or pd.isna(name) or pd.isna(dob_raw) or not str(name).strip():
+                    rejects.append((excel_row, medicare_id, name, dob_raw, 'missing MEDICARE ID, NAME or DOB'))
+                    continue
+                if medicare_id in patient_index:
+                    rejects.append((excel_row, medicare_id, name, dob_raw, 'duplicate MEDICARE ID (first row kept)'))
+                    continue
+                if dob is None:
+                    rejects.append((excel_row, medicare_id, name, dob_raw, 'unparseable DOB'))
+                    continue
 
-            row = df[df['MEDICARE ID'] == medicare_id]
-            if not row.empty:
-                name = row.iloc[0]['NAME']
-                dob_raw = row.iloc[0]['DOB']
-                dob = self.format_date(dob_raw)
-                return name, dob
-            else:
-                logging.warning(f"Medicare ID '{medicare_id}' not found in the Excel file.")
-                return None
+                full_name = str(name).strip().split()
+                patient_index[medicare_id] = batch[medicare_id] = {
+                    'name': name,
+                    'first_name': full_name[0],
+                    'last_name': full_name[-1] if len(full_name) > 1 else '',
+                    'dob': dob,
+                }
+            # Problems are reported as each batch is read, before any of its IDs are scraped
+            if rejects:
+                self._write_rejects_report(report_filename, rejects, header=not rejected)
+                rejected += len(rejects)
+                logging.warning(f"{len(rejects)} rows of {input_data_filename} up to row {chunk[-1][0]} will not be scraped; see {report_filename}")
+            if batch:
+                yield batch
 
-        except Exception as e:
-            logging.error(f"Error retrieving information for Medicare ID {medicare_id}: {e}")
-            return None
+        if rejected:
+            logging.warning(f"{rejected} rows of {input_data_filename} will not be scraped in total; see {report_filename}")
+        logging.info(f"Indexed {len(patient_index)} patients from {input_data_filename}")
+
+    def _write_rejects_report(self, report_filename, rejects, header):
+        with open(report_filename, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if header:
+                writer.writerow(['ROW', 'MEDICARE ID', 'NAME', 'DOB', 'REASON'])
+            writer.writerows(rejects)
+
+    # to convert a whole DOB column to MM/DD/YYYY strings at once
+    def normalize_dates(self, values, cache_key=None):
+        """Return a list of MM/DD/YYYY strings (None where unparseable) for datetimes, Excel serials and date strings."""
+        import pandas as pd
+        parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+        kinds = values.map(type)
+
+        is_datetime = kinds.map(lambda kind: issubclass(kind, datetime))
+        if is_datetime.any():
+            parsed[is_datetime] = self._to_datetimes(values[is_datetime])
 
-    def format_date(self, dob):
+        # Excel serial numbers count days from 1899-12-30
+        is_number = kinds.map(lambda kind: issubclass(kind, (int, float)) and not issubclass(kind, bool)) & values.notna()
+        if is_number.any():
+            parsed[is_number] = self._to_datetimes(values[is_number].astype(float), unit='D', origin='1899-12-30')
+
+        is_string = kinds.map(lambda kind: issubclass(kind, str))
+        if is_string.any():
+            strings = values[is_string].str.strip()
+            formats = self._string_date_formats(strings, cache_key)
+            # Detected format first; other formats only pick up rows it leaves unparsed
+            for fmt in formats:
+                remaining = strings[parsed[strings.index].isna()]
+                if remaining.empty:
+                    break
+                parsed[remaining.index] = self._to_datetimes(remaining, format=fmt)
+
+        return [None if pd.isna(value) else value for value in parsed.dt.strftime("%m/%d/%Y")]
+
+    def _to_datetimes(self, values, **kwargs):
+        """pd.to_datetime with errors='coerce', except that values outside the datetime64[ns] range become NaT too."""
+        import pandas as pd
         try:
-            # If dob is already a datetime object, format it
-            if isinstance(dob, datetime):
-                return dob.strftime("%m/%d/%Y")
-            
-            elif isinstance(dob, str):
-                for fmt in ("%m/%d/%Y", "%Y-%m-%d", "%d/%m/%Y", "%m-%d-%Y", "%d-%m-%Y"):
-                    try: return datetime.strptime(dob.strip(), fmt).strftime("%m/%d/%Y")
-                    except ValueError: continue  
-                print(f"Failed to parse string '{dob}' into a date")
-                return dob
-            
-            elif isinstance(dob, (int, float)):
-                return (datetime(1899, 12, 30) + timedelta(days=dob)).strftime("%m/%d/%Y")
-            
-            else:
-                print(f"Unsupported type: {type(dob)}")
-                return dob
+            return pd.to_datetime(values, errors='coerce', **kwargs).dt.as_unit('ns')
+        except (ValueError, OverflowError, AssertionError):
+            # One out-of-range value (a typo like 03/04/0195) makes the whole call raise rather than coerce
+            # (AssertionError on some pandas versions), so convert row by row and drop only the bad ones
+            return pd.Series([self._to_datetime(value, **kwargs) for value in values], index=values.index,
+                             dtype='datetime64[ns]')
 
-        except Exception as e:
-            print(f"Error: {e}")
-            return None
+    def _to_datetime(self, value, **kwargs):
+        import pandas as pd
+        try:
+            return pd.to_datetime(value, errors='coerce', **kwargs).as_unit('ns')
+        except (ValueError, OverflowError, AssertionError):
+            return pd.NaT
+
+    def _string_date_formats(self, strings, cache_key):
+        """Candidate formats with the column's detected format first, cached per column."""
+        if cache_key in HandyWrappers._dob_formats:
+            detected = HandyWrappers._dob_formats[cache_key]
+        else:
+            sample = strings.head(500)
+            # Most matches wins; ties keep DOB_FORMATS order, so MM/DD/YYYY beats DD/MM/YYYY
+            detected = max(self.DOB_FORMATS, key=lambda fmt: self._to_datetimes(sample, format=fmt).notna().sum())
+            logging.info(f"Detected date format {detected} for {cache_key}")
+            if cache_key is not None:
+                HandyWrappers._dob_formats[cache_key] = detected
+        return [detected] + [fmt for fmt in self.DOB_FORMATS if fmt != detected]
+
+    # to get the indexed record (name, split name, DOB) of corresponding id
+    def get_patient(self, medicare_id, input_data_filename):
+        patient = self.load_patient_index(input_data_filename).get(medicare_id)
+        if patient is None:
+            logging.warning(f"Medicare ID '{medicare_id}' not found in the Excel file.")
+        return patient
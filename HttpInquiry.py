@@ -0,0 +1,97 @@
+from Automation import OUTCOME_LOCATORS, RESULT_FIELDS, classify_eligibility
+import logging
+
+# Script run in the logged-in browser to capture the eligibility form's target and hidden fields
+FORM_SCRIPT = """
+    const hic = document.querySelector('input[name="hicNumber"]');
+    if (!hic || !hic.form) { return null; }
+    const fields = {};
+    for (const el of hic.form.elements) { if (el.name) { fields[el.name] = el.value; } }
+    return {action: hic.form.action, method: (hic.form.getAttribute('method') || 'post').toLowerCase(), fields: fields};
+"""
+
+
+class HttpInquiry:
+    """Submit eligibility inquiries over a pooled HTTP session that reuses a browser login."""
+
+    def __init__(self, pool_size=10, timeout=30, max_misses=3):
+        self.timeout = timeout
+        self.max_misses = max_misses
+        self.misses = 0
+        self.form = None
+        # Only imported when the fast path is switched on
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=2)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def enabled(self):
+        # Stop trying once the portal keeps answering with pages we cannot parse
+        return self.form is not None and self.misses < self.max_misses
+
+    def attach(self, driver, HW):
+        """Copy the browser's cookies and user agent, and capture the eligibility form. Returns True on success."""
+        HW.click_element(driver, 30, "//a[.='Eligibility' and @id='eligibilityTab']")
+        HW.element_exists(driver, 30, '//input[@name="hicNumber"]')
+        try:
+            self.form = driver.execute_script(FORM_SCRIPT)
+            self.session.headers['User-Agent'] = driver.execute_script("return navigator.userAgent;")
+            self.session.headers['Referer'] = driver.current_url
+            self.session.cookies.clear()
+            for cookie in driver.get_cookies():
+                self.session.cookies.set(cookie['name'], cookie['value'],
+                                         domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        except Exception as e:
+            logging.warning(f"Could not hand the browser session to the HTTP client: {e}")
+            self.form = None
+        self.misses = 0
+        if self.form is None:
+            logging.warning('Eligibility form not found; HTTP fast path disabled for this session.')
+        return self.form is not None
+
+    def lookup(self, medicare_id, patient):
+        """Return the output row for one ID, or None when the browser path should handle it."""
+        fields = dict(self.form['fields'])
+        fields.update({'beneficiaryLastName': patient['last_name'], 'beneficiaryFirstName': patient['first_name'],
+                       'hicNumber': medicare_id, 'beneficiaryDateOfBirth': patient['dob']})
+        try:
+            if self.form['method'] == 'get':
+                response = self.session.get(self.form['action'], params=fields, timeout=self.timeout)
+            else:
+                response = self.session.post(self.form['action'], data=fields, timeout=self.timeout)
+            response.raise_for_status()
+            row = self.parse(response.text, medicare_id, patient)
+        except Exception as e:
+            logging.warning(f"HTTP inquiry failed for {medicare_id}: {e}")
+            row = None
+
+        if row is None:
+            self.misses += 1
+            logging.info(f"Falling back to the browser for MEDICARE ID: {medicare_id}")
+        else:
+            self.misses = 0
+        return row
+
+    def parse(self, page, medicare_id, patient):
+        """Classify a result page the same way Automation does; None if it is not a result page."""
+        from lxml import html
+        tree = html.fromstring(page)
+        outcome = next((name for name, xpath in OUTCOME_LOCATORS.items() if tree.xpath(xpath)), None)
+        if outcome is None:
+            return None
+
+        values = {field: '' for field in RESULT_FIELDS}
+        if outcome == 'FOUND':
+            for field, (tab, xpath) in RESULT_FIELDS.items():
+                nodes = tree.xpath(xpath)
+                values[field] = nodes[0].text_content().strip() if nodes else ''
+            eligibility = classify_eligibility(values['inactive_period'], values['plan_type'], values['msp_insurer_name'])
+        else:
+            eligibility = outcome
+
+        return {'ELIGIBILITY': eligibility, 'INSURANCE NAME': values['insurance_name'],
+                'NAME': patient['name'], 'MEDICARE ID': medicare_id, 'DOB': patient['dob'],
+                'ADDRESS': values['address'], 'CITY': values['city'], 'STATE': values['state'], 'ZIP': values['zip_code']}
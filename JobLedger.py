@@ -0,0 +1,117 @@
+import threading
+import logging
+import sqlite3
+import time
+
+PENDING, IN_FLIGHT, DONE, FAILED = 'pending', 'in_flight', 'done', 'failed'
+
+
+class JobLedger:
+    """On-disk record of every Medicare ID's status, attempts and last error, so runs can resume and retry."""
+
+    def __init__(self, db_filename, max_attempts=3, backoff_base=60, backoff_max=900):
+        self.db_filename = db_filename
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lock = threading.Lock()
+        # Workers share the connection; every statement runs under self.lock
+        self.conn = sqlite3.connect(db_filename, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                                medicare_id TEXT PRIMARY KEY,
+                                status TEXT NOT NULL,
+                                attempts INTEGER NOT NULL DEFAULT 0,
+                                last_error TEXT,
+                                next_attempt_at REAL NOT NULL DEFAULT 0,
+                                updated_at REAL NOT NULL)''')
+        # IDs a crashed run left in flight are offered again; done once, before this run claims anything
+        reclaimed = self.conn.execute('UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?',
+                                      (PENDING, time.time(), IN_FLIGHT)).rowcount
+        self.conn.commit()
+        if reclaimed:
+            logging.info(f"{reclaimed} MEDICARE IDs left in flight by a previous run are pending again.")
+        # In-memory copy of the status column for O(1) lookups
+        self.statuses = dict(self.conn.execute('SELECT medicare_id, status FROM jobs'))
+
+    def sync(self, medicare_ids, scraped_medicare_ids):
+        """Match the batch's statuses to the output: IDs in it are done, done or failed IDs missing from it are pending."""
+        now = time.time()
+        medicare_ids = [str(medicare_id) for medicare_id in medicare_ids]
+        scraped = [medicare_id for medicare_id in medicare_ids if medicare_id in scraped_medicare_ids]
+        # The output file is the record of what is done; IDs missing from it (e.g. a fresh output) are scraped again,
+        # and IDs an earlier run gave up on get a fresh set of attempts, so max_attempts caps retries within one run
+        reopened = [medicare_id for medicare_id in medicare_ids
+                    if self.statuses.get(medicare_id) in (DONE, FAILED) and medicare_id not in scraped_medicare_ids]
+        with self.lock:
+            self.conn.executemany('INSERT OR IGNORE INTO jobs (medicare_id, status, updated_at) VALUES (?, ?, ?)',
+                                  [(medicare_id, PENDING, now) for medicare_id in medicare_ids])
+            self.conn.executemany('UPDATE jobs SET status = ?, updated_at = ? WHERE medicare_id = ?',
+                                  [(DONE, now, medicare_id) for medicare_id in scraped])
+            self.conn.executemany('UPDATE jobs SET status = ?, attempts = 0, last_error = NULL, next_attempt_at = 0, '
+                                  'updated_at = ? WHERE medicare_id = ?',
+                                  [(PENDING, now, medicare_id) for medicare_id in reopened])
+            self.conn.commit()
+            for medicare_id in medicare_ids:
+                self.statuses.setdefault(medicare_id, PENDING)
+            for medicare_id in scraped:
+                self.statuses[medicare_id] = DONE
+            for medicare_id in reopened:
+                self.statuses[medicare_id] = PENDING
+
+    def status(self, medicare_id):
+        return self.statuses.get(str(medicare_id))
+
+    def pending(self, medicare_ids):
+        """IDs still to scrape, in input order."""
+        return [medicare_id for medicare_id in medicare_ids if self.statuses.get(str(medicare_id)) == PENDING]
+
+    def retryable(self, medicare_ids):
+        """Failed IDs with attempts left, in input order, and the earliest time the next pass may start."""
+        with self.lock:
+            rows = dict((medicare_id, next_attempt_at) for medicare_id, next_attempt_at in self.conn.execute(
+                'SELECT medicare_id, next_attempt_at FROM jobs WHERE status = ? AND attempts < ?',
+                (FAILED, self.max_attempts)))
+        retry_ids = [medicare_id for medicare_id in medicare_ids if str(medicare_id) in rows]
+        return retry_ids, max((rows[str(medicare_id)] for medicare_id in retry_ids), default=0)
+
+    def claim(self, medicare_id):
+        self._update(medicare_id, IN_FLIGHT, 'attempts = attempts + 1')
+
+    def mark_done(self, medicare_id):
+        self._update(medicare_id, DONE, 'last_error = NULL')
+
+    def mark_failed(self, medicare_id, error):
+        with self.lock:
+            attempts = self.conn.execute('SELECT attempts FROM jobs WHERE medicare_id = ?',
+                                         (str(medicare_id),)).fetchone()[0]
+            # Exponential backoff before the ID is offered to a later pass
+            delay = min(self.backoff_max, self.backoff_base * 2 ** max(attempts - 1, 0))
+            self.conn.execute('UPDATE jobs SET status = ?, last_error = ?, next_attempt_at = ?, updated_at = ? '
+                              'WHERE medicare_id = ?',
+                              (FAILED, str(error)[:500], time.time() + delay, time.time(), str(medicare_id)))
+            self.conn.commit()
+            self.statuses[str(medicare_id)] = FAILED
+
+    def _update(self, medicare_id, status, extra):
+        with self.lock:
+            self.conn.execute(f'UPDATE jobs SET status = ?, updated_at = ?, {extra} WHERE medicare_id = ?',
+                              (status, time.time(), str(medicare_id)))
+            self.conn.commit()
+            self.statuses[str(medicare_id)] = status
+
+    def given_up(self, medicare_ids):
+        """Failed IDs with no attempts left, in input order, with their last error."""
+        with self.lock:
+            rows = dict(self.conn.execute('SELECT medicare_id, last_error FROM jobs WHERE status = ? AND attempts >= ?',
+                                          (FAILED, self.max_attempts)))
+        return [(medicare_id, rows[str(medicare_id)]) for medicare_id in medicare_ids if str(medicare_id) in rows]
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status'))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
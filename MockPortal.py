@@ -0,0 +1,277 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import threading
+import argparse
+import logging
+import secrets
+import random
+import time
+import zlib
+
+# Outcomes a Medicare ID can map to, chosen deterministically from the ID
+OUTCOMES = ['DEAD', 'ID ERROR', 'INACTIVE PART B', 'PLAN TYPE', 'MSP', 'MED B']
+PLAN_TYPE = 'MEDICARE ADVANTAGE'
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>eServices (mock)</title>
+<style>@font-face {{ font-family: Portal; src: url('/static/portal.woff2'); }} body {{ font-family: Portal, sans-serif; }}</style>
+<script src="/static/analytics.js"></script>
+<script>
+function showTab(id) {{
+    document.querySelectorAll('.tab-pane').forEach(function (p) {{ p.style.display = (p.id === id) ? 'block' : 'none'; }});
+}}
+</script></head>
+<body><img src="/static/banner.png" alt="">{body}</body></html>"""
+
+# Stand-ins for the real portal's heavy assets, so blocking them shows up in the benchmark
+STATIC_ASSETS = {
+    '/static/portal.woff2': ('font/woff2', 200 * 1024),
+    '/static/banner.png': ('image/png', 300 * 1024),
+    '/static/analytics.js': ('application/javascript', 100 * 1024),
+}
+
+NAV = """<ul class="nav">
+<li><a id="eligibilityTab" href="/eligibility">Eligibility</a></li>
+<li><a href="/eligibility">Inquiry</a></li>
+</ul>"""
+
+LOGIN = """<h2>Log into eServices</h2>
+<form method="post" action="/login">
+<input type="text" name="userId"><input type="password" name="password">
+<a href="#" title="Log into eServices" onclick="this.closest('form').submit(); return false;">Log In</a>
+</form>"""
+
+LOGIN_FAILED = """<p>The user ID or password is incorrect.</p><a href="/">Return to login page</a>"""
+
+ACCESS_CODE = """<form method="post" action="/access-code">
+{error}<input type="text" name="accessCode">
+<button type="submit" name="submitAccessCode">Submit</button>
+</form>"""
+
+ACKNOWLEDGE = """<div id="dialog" style="position:fixed;top:0;left:0;width:100%;background:#eee;">
+<p>Privacy notice</p><button onclick="document.getElementById('dialog').remove();">I ACKNOWLEDGE</button>
+</div>"""
+
+INQUIRY_FORM = """<h3>Beneficiary Information</h3>
+<form method="post" action="/inquiry">
+<input type="hidden" name="csrfToken" value="{csrf}">
+<input type="text" name="beneficiaryLastName"><input type="text" name="beneficiaryFirstName">
+<input type="text" name="hicNumber"><input type="text" name="beneficiaryDateOfBirth">
+<button type="submit">Submit</button>
+</form>"""
+
+NOT_FOUND = """<div class="alert"><h4 class="alert-heading">Error</h4>
+<p>The beneficiary you requested cannot be found. Please verify your information.</p></div>"""
+
+DOD = """<span><span>DOD:</span> {dod}</span>"""
+
+RESULT = """<ul class="tabs">
+<li aria-controls="eligibility"><a href="#" onclick="showTab('eligibility'); return false;">Eligibility</a></li>
+<li aria-controls="PalnCoverage"><a href="#" onclick="showTab('PalnCoverage'); return false;">Plan Coverage</a></li>
+<li aria-controls="MSP"><a href="#" onclick="showTab('MSP'); return false;">MSP</a></li>
+</ul>
+{dod}
+<div class="tab-pane" id="eligibility" style="display:block">
+  <div aria-describedby="mdppinactive"><h3>MDPP Inactive Periods</h3>
+    <div class="row margin"><div>Inactive Period:</div><div>{inactive}</div></div></div>
+  <div aria-describedby="beneaddressEliggFields"><h3>Beneficiary Address</h3>
+    <div class="row margin"><div>Address:</div><div>{address}</div><div>Address 2:</div><div></div>
+    <div>City:</div><div>{city}</div><div>State:</div><div>{state}</div><div>ZIP:</div><div>{zip}</div></div></div>
+</div>
+<div class="tab-pane" id="PalnCoverage" style="display:none">
+  <div class="row margin"><div><p>Plan Type:</p></div><div>{plan_type}</div></div>
+  <h3>Medicare Part D</h3>
+  <div id="medicarepartDPlanCoverageFields">
+    <div class="row margin"><span>Contract</span></div>
+    <div class="row margin"><span>Plan:</span><span>S1234</span><span>Name:</span><span>{insurance}</span></div></div>
+</div>
+<div class="tab-pane" id="MSP" style="display:none">
+  <div aria-describedby="medicaresecondarypayermspFields"><h3>Medicare Secondary Payer</h3>
+    <div class="row margin"><div>Type:</div><div>{msp_type}</div><div>Effective:</div><div>{msp_date}</div>
+    <div>Insurer:</div><div>{msp_insurer}</div></div></div>
+</div>"""
+
+
+def expected_outcome(medicare_id):
+    """The outcome the mock portal returns for a Medicare ID."""
+    return OUTCOMES[zlib.crc32(str(medicare_id).encode()) % len(OUTCOMES)]
+
+
+def expected_eligibility(medicare_id):
+    """The ELIGIBILITY value Automation should write for a Medicare ID."""
+    outcome = expected_outcome(medicare_id)
+    return PLAN_TYPE if outcome == 'PLAN TYPE' else outcome
+
+
+class MockPortal:
+    """Local stand-in for the eServices portal, with configurable latency and failure injection."""
+
+    def __init__(self, host='127.0.0.1', port=0, username='bench', password='bench', access_code=123456,
+                 latency=0.0, jitter=0.0, failure_rate=0.0, session_ttl=None, seed=None):
+        self.username = username
+        self.password = password
+        self.access_code = str(access_code)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.session_ttl = session_ttl
+        self.random = random.Random(seed)
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info(f"Mock eServices portal listening on {self.url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _delay(self):
+        with self.lock:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+    def _fail(self):
+        with self.lock:
+            return self.random.random() < self.failure_rate
+
+    def _session(self, token):
+        with self.lock:
+            session = self.sessions.get(token)
+            if session and self.session_ttl and time.time() - session['created'] > self.session_ttl:
+                del self.sessions[token]
+                return None
+            return session
+
+    def _handler(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, body, status=200, cookie=None):
+                data = PAGE.format(body=body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                if cookie:
+                    self.send_header('Set-Cookie', f"session={cookie}; Path=/")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _redirect(self, location, cookie=None):
+                self.send_response(303)
+                self.send_header('Location', location)
+                self.send_header('Content-Length', '0')
+                if cookie:
+                    self.send_header('Set-Cookie', f"session={cookie}; Path=/")
+                self.end_headers()
+
+            def _token(self):
+                for part in self.headers.get('Cookie', '').split(';'):
+                    name, _, value = part.strip().partition('=')
+                    if name == 'session':
+                        return value
+                return None
+
+            def _form(self):
+                length = int(self.headers.get('Content-Length', 0))
+                return {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+
+            def do_GET(self):
+                portal._delay()
+                path = urlparse(self.path).path
+                session = portal._session(self._token())
+                if path == '/eligibility' and session and session['verified']:
+                    acknowledge = ACKNOWLEDGE if session.pop('acknowledge', False) else ''
+                    return self._send(acknowledge + NAV + INQUIRY_FORM.format(csrf=session['csrf']))
+                if path == '/access-code' and session:
+                    return self._send(ACCESS_CODE.format(error=''))
+                if path in ('/', '/eligibility', '/access-code'):
+                    return self._send(LOGIN)
+                if path in STATIC_ASSETS:
+                    content_type, size = STATIC_ASSETS[path]
+                    self.send_response(200)
+                    self.send_header('Content-Type', content_type)
+                    self.send_header('Content-Length', str(size))
+                    self.end_headers()
+                    self.wfile.write((b'//' if content_type.endswith('javascript') else b'\0') * size)
+                    return
+                self._send('<p>Not found</p>', status=404)
+
+            def do_POST(self):
+                portal._delay()
+                path = urlparse(self.path).path
+                form = self._form()
+                token = self._token()
+                session = portal._session(token)
+
+                if path == '/login':
+                    if form.get('userId') == portal.username and form.get('password') == portal.password:
+                        token = secrets.token_hex(16)
+                        with portal.lock:
+                            portal.sessions[token] = {'created': time.time(), 'verified': False,
+                                                      'csrf': secrets.token_hex(8)}
+                        return self._redirect('/access-code', cookie=token)
+                    return self._send(LOGIN_FAILED)
+
+                if path == '/access-code' and session:
+                    if form.get('accessCode', '').strip() == portal.access_code:
+                        session['verified'], session['acknowledge'] = True, True
+                        return self._redirect('/eligibility')
+                    return self._send(ACCESS_CODE.format(
+                        error='<span>The verification code entered does not match our records.</span>'))
+
+                if path == '/inquiry' and session and session['verified']:
+                    if portal._fail():
+                        return self._send('<p>Service temporarily unavailable.</p>', status=500)
+                    return self._send(NAV + self._result(form.get('hicNumber', '')))
+
+                self._send(LOGIN)
+
+            def _result(self, medicare_id):
+                outcome = expected_outcome(medicare_id)
+                if outcome == 'ID ERROR':
+                    return NOT_FOUND
+                # The real page has several DOD labels; only a deceased beneficiary has values in them
+                dod = ''.join(DOD.format(dod='01/15/2020' if outcome == 'DEAD' else '') for _ in range(3))
+                return RESULT.format(
+                    dod=dod,
+                    inactive='01/01/2021 - 12/31/2021' if outcome == 'INACTIVE PART B' else '',
+                    address='100 MAIN ST', city='SPRINGFIELD', state='IL', zip='62701',
+                    plan_type=PLAN_TYPE if outcome == 'PLAN TYPE' else '',
+                    insurance='ACME RX PLAN',
+                    msp_type='12' if outcome == 'MSP' else '', msp_date='01/01/2019' if outcome == 'MSP' else '',
+                    msp_insurer='ACME EMPLOYER GROUP' if outcome == 'MSP' else '')
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the mock eServices portal.')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random seconds, up to this value')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of inquiries answered with HTTP 500')
+    parser.add_argument('--session-ttl', type=float, default=None, help='seconds before a login expires')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    portal = MockPortal(port=args.port, latency=args.latency, jitter=args.jitter,
+                        failure_rate=args.failure_rate, session_ttl=args.session_ttl).start()
+    try:
+        portal.thread.join()
+    except KeyboardInterrupt:
+        portal.stop()
@@ -0,0 +1,88 @@
+import threading
+import logging
+import sqlite3
+import json
+import time
+
+DAY = 24 * 3600
+
+
+class ResultCache:
+    """Cross-run cache of extracted rows keyed by Medicare ID and DOB, with per-outcome freshness windows."""
+
+    # Seconds a row stays fresh, by ELIGIBILITY; anything else (plan types) uses default_ttl
+    DEFAULT_TTLS = {'DEAD': 365 * DAY, 'ID ERROR': 1 * DAY, 'INACTIVE PART B': 14 * DAY,
+                    'MSP': 7 * DAY, 'MED B': 3 * DAY, 'UNKNOWN': 0}
+
+    def __init__(self, db_filename, ttls=None, default_ttl=7 * DAY, max_entries=200000):
+        self.db_filename = db_filename
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.hits = self.misses = self.puts = 0
+        self.lock = threading.Lock()
+        # Workers share the connection; every statement runs under self.lock
+        self.conn = sqlite3.connect(db_filename, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS results (
+                                medicare_id TEXT NOT NULL,
+                                dob TEXT NOT NULL,
+                                eligibility TEXT,
+                                row_json TEXT NOT NULL,
+                                stored_at REAL NOT NULL,
+                                expires_at REAL NOT NULL,
+                                last_used REAL NOT NULL,
+                                PRIMARY KEY (medicare_id, dob))''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)')
+        self.conn.commit()
+
+    def get(self, medicare_id, dob):
+        """Return the cached row if it is still fresh, else None."""
+        now = time.time()
+        with self.lock:
+            found = self.conn.execute('SELECT row_json FROM results WHERE medicare_id = ? AND dob = ? AND expires_at > ?',
+                                      (str(medicare_id), str(dob), now)).fetchone()
+            if found:
+                self.hits += 1
+                self.conn.execute('UPDATE results SET last_used = ? WHERE medicare_id = ? AND dob = ?',
+                                  (now, str(medicare_id), str(dob)))
+                self.conn.commit()
+                return json.loads(found[0])
+            self.misses += 1
+            return None
+
+    def put(self, row):
+        """Store a freshly extracted output row; outcomes with no freshness window are skipped."""
+        ttl = self.ttls.get(row.get('ELIGIBILITY'), self.default_ttl)
+        if ttl <= 0:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                              (str(row['MEDICARE ID']), str(row['DOB']), row.get('ELIGIBILITY'),
+                               json.dumps(row, default=str), now, now + ttl, now))
+            # Eviction scans the table, so it runs every 100 stores rather than on each one
+            self.puts += 1
+            if self.puts % 100 == 1:
+                self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        # Expired rows go first, then the least recently used ones beyond max_entries
+        self.conn.execute('DELETE FROM results WHERE expires_at <= ?', (now,))
+        excess = self.conn.execute('SELECT COUNT(*) FROM results').fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.conn.execute('DELETE FROM results WHERE rowid IN '
+                              '(SELECT rowid FROM results ORDER BY last_used LIMIT ?)', (excess,))
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def log_summary(self):
+        logging.info(f"Result cache: {self.hits} hits / {self.hits + self.misses} lookups ({self.hit_rate():.1%} hit rate).")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,214 @@
+import threading
+import logging
+import json
+import os
+
+# Column order of the output workbook
+OUTPUT_HEADERS = ['ELIGIBILITY', 'INSURANCE NAME', 'NAME', 'MEDICARE ID',
+                  'DOB', 'ADDRESS', 'CITY', 'STATE', 'ZIP']
+
+
+class ResultWriter:
+    """Journal every result row to disk, then flush to the output xlsx in batches on a background thread."""
+
+    def __init__(self, output_data_filename, batch_size=500, flush_interval=60):
+        self.output_data_filename = output_data_filename
+        self.journal_filename = f"{os.path.splitext(output_data_filename)[0]}.journal.jsonl"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending_rows = []
+        # Journaled rows not yet in the xlsx, including ones still waiting for their turn
+        self.journaled_rows = []
+        # Workers share one writer, so journal appends and the pending/journaled lists are serialized
+        self.lock = threading.RLock()
+        # Held for the length of an xlsx save, which happens outside self.lock so workers never wait on it
+        self.flush_lock = threading.Lock()
+        # Workbook and its saved IDs stay in memory between flushes instead of being re-read each time
+        self.workbook = None
+        self.saved_ids = set()
+        self.flush_requested = threading.Event()
+        self.stopping = threading.Event()
+        self.flusher = None
+
+    def recover(self):
+        """Replay rows left in the journal by a previous run into the xlsx."""
+        if not os.path.exists(self.journal_filename):
+            return 0
+
+        with open(self.journal_filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write can only leave the last line truncated
+                    logging.warning(f"Skipping unreadable journal line in {self.journal_filename}")
+                    continue
+                self.journaled_rows.append(row)
+                self.pending_rows.append(row)
+
+        replayed = len(self.pending_rows)
+        if replayed:
+            logging.info(f"Replaying {replayed} journaled rows into {self.output_data_filename}")
+        self.flush()
+        return replayed
+
+    def journal(self, row):
+        """Durably append one row dict to the journal and return it in output column order."""
+        row = {header: row.get(header, '') for header in OUTPUT_HEADERS}
+        with self.lock:
+            with open(self.journal_filename, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(row, default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.journaled_rows.append(row)
+        return row
+
+    def discard(self, row):
+        """Drop a journaled row that will never be written, e.g. from an attempt that failed."""
+        with self.lock:
+            self.journaled_rows = [journaled for journaled in self.journaled_rows if journaled is not row]
+            self._rewrite_journal()
+
+    def write(self, row, journaled=False):
+        """Journal one row (unless already done) and queue it for the next background flush."""
+        with self.lock:
+            if not journaled:
+                row = self.journal(row)
+            self.pending_rows.append(row)
+            if self.flusher is None or not self.flusher.is_alive():
+                self.stopping.clear()
+                self.flusher = threading.Thread(target=self._flush_loop, name='result-flusher', daemon=True)
+                self.flusher.start()
+            if len(self.pending_rows) >= self.batch_size:
+                self.flush_requested.set()
+
+    def _flush_loop(self):
+        # Flushes every batch_size rows or flush_interval seconds, whichever comes first
+        while not self.stopping.is_set():
+            self.flush_requested.wait(self.flush_interval)
+            self.flush_requested.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Rows stay in the journal, so the next flush (or the next run's recover) retries them
+                logging.error(f"Error flushing rows to {self.output_data_filename}: {e}")
+
+    def flush(self):
+        """Append pending rows to the xlsx, then drop them from the journal."""
+        with self.flush_lock:
+            with self.lock:
+                rows, self.pending_rows = self.pending_rows, []
+            if not rows:
+                return
+            try:
+                self._save(rows)
+            except Exception:
+                with self.lock:
+                    self.pending_rows = rows + self.pending_rows
+                raise
+
+            # Keep only rows that are journaled but not yet flushed
+            flushed = {id(row) for row in rows}
+            with self.lock:
+                self.journaled_rows = [row for row in self.journaled_rows if id(row) not in flushed]
+                self._rewrite_journal()
+
+    def _save(self, rows):
+        if self.workbook is None:
+            from openpyxl import Workbook, load_workbook
+            if os.path.exists(self.output_data_filename):
+                self.workbook = load_workbook(self.output_data_filename)
+                # Skip rows already saved, in case a crash hit between saving the xlsx and clearing the journal
+                id_column = OUTPUT_HEADERS.index('MEDICARE ID') + 1
+                self.saved_ids = {str(cell.value) for cell in next(self.workbook.active.iter_cols(
+                    min_col=id_column, max_col=id_column, min_row=2), ())}
+            else:
+                self.workbook = Workbook()
+                self.workbook.active.title = 'Sheet1'
+                self.workbook.active.append(OUTPUT_HEADERS)
+
+        sheet = self.workbook.active
+        for row in rows:
+            if str(row['MEDICARE ID']) not in self.saved_ids:
+                sheet.append([row[header] for header in OUTPUT_HEADERS])
+                self.saved_ids.add(str(row['MEDICARE ID']))
+
+        # Save to a temp file and swap it in so a crash never leaves a half-written workbook
+        temp_filename = f"{self.output_data_filename}.tmp"
+        self.workbook.save(temp_filename)
+        os.replace(temp_filename, self.output_data_filename)
+        logging.info(f"Flushed {len(rows)} rows to {self.output_data_filename}")
+
+    def _rewrite_journal(self):
+        temp_filename = f"{self.journal_filename}.tmp"
+        with open(temp_filename, 'w', encoding='utf-8') as f:
+            for row in self.journaled_rows:
+                f.write(json.dumps(row, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_filename, self.journal_filename)
+
+    def close(self):
+        """Stop the background flusher and flush whatever is still buffered."""
+        self.stopping.set()
+        self.flush_requested.set()
+        if self.flusher is not None:
+            self.flusher.join()
+            self.flusher = None
+        self.flush_requested.clear()
+        self.flush()
+
+
+class OrderedResultWriter:
+    """Hand rows from concurrent workers to a ResultWriter in input order."""
+
+    def __init__(self, result_writer):
+        self.result_writer = result_writer
+        self.lock = threading.Lock()
+        self.next_seq = 0
+        self.finished = {}
+
+    def slot(self, seq):
+        """Return the writer a worker passes to Automation for the ID at position seq."""
+        return ResultSlot(self, seq)
+
+    def _finish(self, seq, row):
+        with self.lock:
+            self.finished[seq] = row
+            # Release the contiguous run of finished IDs; failed IDs leave no row behind
+            while self.next_seq in self.finished:
+                row = self.finished.pop(self.next_seq)
+                self.next_seq += 1
+                if row is not None:
+                    self.result_writer.write(row, journaled=True)
+
+    def close(self):
+        """Write rows still waiting on an unfinished predecessor, then flush."""
+        with self.lock:
+            for seq in sorted(self.finished):
+                if self.finished[seq] is not None:
+                    self.result_writer.write(self.finished[seq], journaled=True)
+            self.finished.clear()
+        self.result_writer.close()
+
+
+class ResultSlot:
+    """Single-row writer for one ID; journals at once, releases in order."""
+
+    def __init__(self, ordered_writer, seq):
+        self.ordered_writer = ordered_writer
+        self.seq = seq
+        self.row = None
+
+    def write(self, row):
+        # Journal right away so a crash loses nothing while the row waits its turn
+        self.row = self.ordered_writer.result_writer.journal(row)
+
+    def discard(self):
+        """Drop the row written for a failed attempt; release() then leaves a gap instead."""
+        if self.row is not None:
+            self.ordered_writer.result_writer.discard(self.row)
+            self.row = None
+
+    def release(self):
+        self.ordered_writer._finish(self.seq, self.row)
@@ -0,0 +1,62 @@
+from WaitPolicy import wait_policy
+import time
+
+
+class SessionHealth:
+    """Decide when a worker's browser session should be recycled, based on what it observes."""
+
+    def __init__(self, max_age=3600, max_consecutive_failures=3, max_errors=10, max_memory_growth_mb=500):
+        self.max_age = max_age
+        self.max_consecutive_failures = max_consecutive_failures
+        self.max_errors = max_errors
+        self.max_memory_growth_mb = max_memory_growth_mb
+        self.reset(None)
+
+    def reset(self, driver):
+        """Start tracking a fresh session."""
+        self.started_at = time.monotonic()
+        self.consecutive_failures = 0
+        self.errors = 0
+        self.handled = 0
+        self.baseline_memory = self._js_heap_mb(driver) if driver else None
+
+    def record(self, succeeded):
+        self.handled += 1
+        if succeeded:
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+            self.errors += 1
+
+    def recycle_reason(self, driver):
+        """Return why the session should be replaced, or None while it is healthy."""
+        try:
+            if self._on_login_page(driver):
+                return 'login page reappeared'
+        except Exception as e:
+            return f'browser not responding ({e})'
+        if wait_policy.tripped():
+            return 'wait circuit breaker open'
+        if self.consecutive_failures >= self.max_consecutive_failures:
+            return f'{self.consecutive_failures} consecutive failures'
+        if self.errors >= self.max_errors:
+            return f'{self.errors} errors in this session'
+        if time.monotonic() - self.started_at >= self.max_age:
+            return f'session older than {self.max_age} s'
+
+        memory = self._js_heap_mb(driver)
+        if memory is not None and self.baseline_memory is not None \
+                and memory - self.baseline_memory >= self.max_memory_growth_mb:
+            return f'JS heap grew {memory - self.baseline_memory:.0f} MB'
+        return None
+
+    # Both probes run as scripts so they return at once instead of waiting on implicit waits
+    def _on_login_page(self, driver):
+        return bool(driver.execute_script("return !!document.querySelector('input[name=\"userId\"]');"))
+
+    def _js_heap_mb(self, driver):
+        try:
+            used = driver.execute_script("return window.performance.memory ? performance.memory.usedJSHeapSize : null;")
+            return used / (1024 * 1024) if used else None
+        except Exception:
+            return None
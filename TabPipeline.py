@@ -0,0 +1,130 @@
+from queue import Empty
+from selenium.common.exceptions import TimeoutException
+from Automation import OUTCOME_LOCATORS
+from Timing import timer
+from WaitPolicy import wait_policy
+import logging
+import time
+
+# Same key HandyWrappers.wait_for_any learns the outcome latency under
+OUTCOME_KEY = ' | '.join(OUTCOME_LOCATORS)
+
+
+class TabPipeline:
+    """Keep several inquiries in flight in one logged-in driver, one per browser tab."""
+
+    def __init__(self, pool, worker_id, driver, tabs, outcome_timeout=30):
+        self.pool = pool
+        self.AutBot = pool.AutBot
+        self.worker_id = worker_id
+        self.driver = driver
+        self.outcome_timeout = outcome_timeout
+
+        # Extra tabs open the page the login ended on and share its cookies
+        url = driver.current_url
+        self.handles = [driver.current_window_handle]
+        for _ in range(tabs - 1):
+            driver.switch_to.new_window('tab')
+            driver.get(url)
+            self.handles.append(driver.current_window_handle)
+        self.current = self.handles[-1]
+        self.jobs = {handle: None for handle in self.handles}
+        logging.info(f"[worker-{worker_id}] Pipelining inquiries across {tabs} tabs.")
+
+    def run(self, id_queue, ordered_writer, http, health):
+        """Round-robin the tabs until the queue is drained, or until a recycle is due and in-flight IDs are done."""
+        draining = False
+        while True:
+            progressed = False
+            # Health costs two script round trips, so it is checked once per pass and only when a free tab has work
+            if not draining and not id_queue.empty() and None in self.jobs.values() \
+                    and health.recycle_reason(self.driver):
+                # Let the other tabs finish, then hand the session back for recycling
+                draining = True
+            for handle in self.handles:
+                job = self.jobs[handle]
+                if job is None:
+                    if draining:
+                        continue
+                    job = self._next_job(id_queue, ordered_writer, http, health)
+                    if job:
+                        self._submit(handle, job, health)
+                        progressed = True
+                elif self._collect_if_ready(handle, job, health):
+                    progressed = True
+
+            if all(job is None for job in self.jobs.values()) and (draining or self.pool._drained(id_queue)):
+                return
+            if not progressed:
+                time.sleep(0.05)
+
+    def _next_job(self, id_queue, ordered_writer, http, health):
+        """Next ID that needs a browser; IDs answered over HTTP are finished on the spot."""
+        while True:
+            try:
+                seq, medicare_id = id_queue.get_nowait()
+            except Empty:
+                return None
+            job = self.pool._start_id(self.worker_id, seq, medicare_id, ordered_writer)
+            try:
+                if not self.pool._try_http(http, job):
+                    return job
+                self.pool._finish_id(job, health)
+            except Exception as e:
+                self.pool._finish_id(job, health, e)
+
+    def _switch(self, handle):
+        if self.current != handle:
+            self.driver.switch_to.window(handle)
+            self.current = handle
+
+    def _submit(self, handle, job, health):
+        try:
+            self._switch(handle)
+            # Fails fast here, before submitting, once the wait circuit breaker is open
+            job['outcome_budget'] = wait_policy.budget(OUTCOME_KEY, self.outcome_timeout)
+            self.AutBot.submit_inquiry(self.driver, job['medicare_id'], job['patient'])
+        except Exception as e:
+            self.pool._finish_id(job, health, e)
+            return
+        # The record waits off-thread while this worker serves the other tabs
+        job['submitted_at'] = time.monotonic()
+        job['timing'] = timer.detach()
+        self.jobs[handle] = job
+
+    def _collect_if_ready(self, handle, job, health):
+        """Finish the tab's ID if its outcome is on the page (or its deadline passed); False while still waiting."""
+        try:
+            self._switch(handle)
+            outcome = self.AutBot.HW.first_present(self.driver, OUTCOME_LOCATORS)
+        except Exception as e:
+            outcome, error = None, e
+        else:
+            error = None
+        waited = time.monotonic() - job['submitted_at']
+        if error is None and outcome is None and waited < job['outcome_budget']:
+            return False
+
+        self.jobs[handle] = None
+        timer.attach(job['timing'])
+        timer.add('pipeline.submit_wait', waited)
+        if error is not None:
+            self.pool._finish_id(job, health, error)
+            return True
+        if outcome is None:
+            # Same deadline rule as HandyWrappers.wait_for_any in single-tab mode
+            wait_policy.record_timeout(OUTCOME_KEY, job['outcome_budget'], self.outcome_timeout)
+            timer.timeout(OUTCOME_KEY)
+            # Fail the ID so it is retried, rather than reading an empty page into a MED B row
+            self.pool._finish_id(job, health, TimeoutException(
+                f"None of {list(OUTCOME_LOCATORS)} appeared within {job['outcome_budget']:.1f} s"))
+            return True
+        # Polled between other tabs, so this overstates the latency; the budget errs long
+        wait_policy.record_success(OUTCOME_KEY, waited)
+        try:
+            self.AutBot.collect_result(self.driver, job['medicare_id'], job['patient'], outcome, job['slot'])
+            job['status'] = 'browser'
+            self.pool._finish_id(job, health)
+        except Exception as e:
+            self.pool._finish_id(job, health, e)
+        return True
@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+from collections import Counter, defaultdict
+import functools
+import threading
+import statistics
+import logging
+import json
+import time
+
+
+class StepTimer:
+    """Collect per-step durations and wait timeouts into one record per ID (or login)."""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.metrics_filename = None
+        self.step_seconds = defaultdict(list)
+        self.timeouts = Counter()
+
+    def reset(self):
+        """Forget the run-level totals, e.g. between benchmark runs in one process."""
+        with self.lock:
+            self.step_seconds = defaultdict(list)
+            self.timeouts = Counter()
+
+    def open(self, metrics_filename):
+        """Append every finished record to this JSONL file."""
+        self.metrics_filename = metrics_filename
+
+    def start_record(self, key, kind='id', **fields):
+        self.local.record = {'kind': kind, 'key': key, **fields, 'started': time.time(),
+                             'steps': defaultdict(float), 'timeouts': 0, 'timeout_locators': []}
+        self.local.started_at = self.local.last_lap = time.perf_counter()
+
+    def finish_record(self, status):
+        record = getattr(self.local, 'record', None)
+        if record is None:
+            return None
+        self.local.record = None
+        record['status'] = status
+        record['total'] = time.perf_counter() - self.local.started_at
+        record['steps'] = {step: round(seconds, 4) for step, seconds in record['steps'].items()}
+
+        with self.lock:
+            for step, seconds in record['steps'].items():
+                self.step_seconds[step].append(seconds)
+            self.step_seconds[f"{record['kind']}.total"].append(record['total'])
+            if self.metrics_filename:
+                with open(self.metrics_filename, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, default=str) + '\n')
+        return record
+
+    @contextmanager
+    def span(self, step):
+        """Time a block; nested spans each keep their own (inclusive) duration."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = getattr(self.local, 'record', None)
+            if record is not None:
+                record['steps'][step] += time.perf_counter() - started_at
+
+    def lap(self, step):
+        """Charge the time since the previous lap (or the record start) to a phase."""
+        record = getattr(self.local, 'record', None)
+        now = time.perf_counter()
+        if record is not None:
+            record['steps'][step] += now - self.local.last_lap
+            self.local.last_lap = now
+
+    def add(self, step, seconds):
+        """Charge an externally measured duration to a step."""
+        record = getattr(self.local, 'record', None)
+        if record is not None:
+            record['steps'][step] += seconds
+
+    def detach(self):
+        """Take the thread's open record off it, so the thread can work on another ID meanwhile."""
+        state = (getattr(self.local, 'record', None), getattr(self.local, 'started_at', None),
+                 getattr(self.local, 'last_lap', None))
+        self.local.record = None
+        return state
+
+    def attach(self, state):
+        """Make a detached record current again; laps restart from now."""
+        self.local.record, self.local.started_at, _ = state
+        self.local.last_lap = time.perf_counter()
+
+    def timeout(self, locator):
+        """Count a WebDriverWait that ran out its full timeout."""
+        record = getattr(self.local, 'record', None)
+        if record is not None:
+            record['timeouts'] += 1
+            record['timeout_locators'].append(locator)
+        with self.lock:
+            self.timeouts[locator] += 1
+
+    def summary(self):
+        """Table of per-step totals and percentiles plus the locators that timed out most."""
+        with self.lock:
+            rows = sorted(self.step_seconds.items(), key=lambda item: sum(item[1]), reverse=True)
+            timeouts = self.timeouts.most_common(10)
+            total_timeouts = sum(self.timeouts.values())
+        lines = [f"{'step':<32} {'count':>7} {'total s':>10} {'p50 s':>8} {'p95 s':>8} {'max s':>8}"]
+        for step, values in rows:
+            values = sorted(values)
+            p50 = statistics.median(values)
+            p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+            lines.append(f"{step:<32} {len(values):>7} {sum(values):>10.2f} {p50:>8.2f} {p95:>8.2f} {values[-1]:>8.2f}")
+        lines.append(f"WebDriverWait timeouts: {total_timeouts} (most frequent locators below)")
+        for locator, count in timeouts:
+            lines.append(f"{count:>7}  {locator}")
+        return '\n'.join(lines)
+
+    def log_summary(self):
+        logging.info('Run timing summary:\n' + self.summary())
+
+
+# Shared by HandyWrappers, AutomationBot and WorkerPool
+timer = StepTimer()
+
+
+def timed(step):
+    """Decorator form of timer.span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer.span(step):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,93 @@
+from collections import defaultdict, deque
+import threading
+import logging
+import json
+import os
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of waiting once too many consecutive waits in a session have timed out."""
+
+
+class WaitPolicy:
+    """Per-locator wait budgets learned from how long elements actually take to appear, plus a circuit breaker."""
+
+    def __init__(self, percentile=0.95, multiplier=1.5, margin=1.0, min_timeout=2.0, min_samples=20,
+                 max_samples=200, breaker_threshold=6):
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.margin = margin
+        self.min_timeout = min_timeout
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.breaker_threshold = breaker_threshold
+        self.samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self.lock = threading.Lock()
+        self.filename = None
+        # Consecutive timeouts are counted per worker thread, i.e. per browser session
+        self.local = threading.local()
+
+    def load(self, filename):
+        """Read latencies saved by earlier runs; save() writes back to the same file."""
+        self.filename = filename
+        if not os.path.exists(filename):
+            return
+        try:
+            with open(filename, 'r') as f:
+                saved = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            logging.warning(f"Error reading wait budgets from {filename}. Starting fresh.")
+            return
+        with self.lock:
+            for locator, latencies in saved.items():
+                self.samples[locator].extend(latencies)
+        logging.info(f"Loaded wait latencies for {len(saved)} locators from {filename}")
+
+    def save(self):
+        if not self.filename:
+            return
+        with self.lock:
+            data = {locator: [round(x, 3) for x in latencies] for locator, latencies in self.samples.items()}
+        temp_filename = f"{self.filename}.tmp"
+        with open(temp_filename, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_filename, self.filename)
+
+    def check(self, locator):
+        """Raise CircuitOpenError instead of letting this thread start another wait while the breaker is open."""
+        if self.tripped():
+            raise CircuitOpenError(f"{self.local.consecutive_timeouts} consecutive waits timed out; not waiting for {locator}")
+
+    def budget(self, locator, timeout):
+        """Deadline for a wait on locator whose absence is a valid answer; the call site's timeout is the upper bound."""
+        self.check(locator)
+        with self.lock:
+            latencies = sorted(self.samples.get(locator, ()))
+        if len(latencies) < self.min_samples:
+            return timeout
+        high = latencies[min(len(latencies) - 1, int(self.percentile * len(latencies)))]
+        return min(timeout, max(self.min_timeout, high * self.multiplier + self.margin))
+
+    def record_success(self, locator, seconds):
+        self.local.consecutive_timeouts = 0
+        with self.lock:
+            self.samples[locator].append(seconds)
+
+    def record_timeout(self, locator, budget=None, timeout=None):
+        self.local.consecutive_timeouts = getattr(self.local, 'consecutive_timeouts', 0) + 1
+        if budget is not None and budget < timeout:
+            # The element took at least the budget; recording that lets a portal that has slowed down
+            # raise its own budget instead of failing against the old one forever
+            with self.lock:
+                self.samples[locator].append(budget)
+
+    def tripped(self):
+        return getattr(self.local, 'consecutive_timeouts', 0) >= self.breaker_threshold
+
+    def reset_breaker(self):
+        """Close the breaker for this thread, e.g. once its session has been recycled."""
+        self.local.consecutive_timeouts = 0
+
+
+# Shared by HandyWrappers and SessionHealth
+wait_policy = WaitPolicy()
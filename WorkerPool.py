@@ -0,0 +1,231 @@
+from queue import Queue, Empty
+from ResultWriter import OrderedResultWriter
+from SessionHealth import SessionHealth
+from HttpInquiry import HttpInquiry
+from TabPipeline import TabPipeline
+from Timing import timer
+from WaitPolicy import wait_policy
+import threading
+import logging
+import time
+
+
+class WorkerPool:
+    """Run Automation over a shared ID queue with N independently logged-in browser sessions."""
+
+    def __init__(self, AutBot, eservices_url, headless, username, password, input_data_filename,
+                 workers=1, tabs=1, max_login_attempts=3, session_state=True, http_fast_path=False, profile=None,
+                 **health_limits):
+        self.AutBot = AutBot
+        self.eservices_url = eservices_url
+        self.headless = headless
+        self.username = username
+        self.password = password
+        self.input_data_filename = input_data_filename
+        self.workers = workers
+        # Inquiries kept in flight per worker, one per browser tab
+        self.tabs = tabs
+        self.max_login_attempts = max_login_attempts
+        self.session_state = session_state
+        # Browser only logs in; inquiries go over HTTP, with the browser as fallback
+        self.http_fast_path = http_fast_path
+        # BrowserProfile to launch Chrome with; None keeps seleniumbase's defaults
+        self.profile = profile
+        # Passed to SessionHealth: max_age, max_consecutive_failures, max_errors, max_memory_growth_mb
+        self.health_limits = health_limits
+        # Wall-clock seconds spent on each processed ID
+        self.id_seconds = []
+        # Fresh cached rows, filled by whoever yields the IDs; the feeder writes them in input order without a browser
+        self.cached_rows = {}
+        self.ledger = self.cache = None
+
+    def run(self, medicare_ids, result_writer, ledger=None, cache=None):
+        """Scrape every ID and hand the rows to result_writer in input order, recording outcomes in the ledger.
+
+        medicare_ids may be a lazy iterable; workers start on the first IDs while the rest are still being read.
+        """
+        self.ledger, self.cache = ledger, cache
+        id_queue = Queue()
+        self.fed = threading.Event()
+        ordered_writer = OrderedResultWriter(result_writer)
+        feeder = threading.Thread(target=self._feed, args=(medicare_ids, id_queue, ordered_writer), name='feeder',
+                                  daemon=True)
+        feeder.start()
+
+        threads = [threading.Thread(target=self._worker, args=(worker_id, id_queue, ordered_writer),
+                                    name=f"worker-{worker_id}", daemon=True)
+                   for worker_id in range(1, self.workers + 1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        feeder.join()
+
+        ordered_writer.close()
+        if not id_queue.empty():
+            logging.error(f"All workers stopped with {id_queue.qsize()} MEDICARE IDs left unprocessed.")
+        timer.log_summary()
+        # Persist what this run learned about element latencies for the next one
+        wait_policy.save()
+
+    def _feed(self, medicare_ids, id_queue, ordered_writer):
+        """Queue IDs that need scraping; cache hits take their place in the output order straight away."""
+        try:
+            for seq, medicare_id in enumerate(medicare_ids):
+                cached_row = self.cached_rows.pop(medicare_id, None)
+                if cached_row is None:
+                    id_queue.put((seq, medicare_id))
+                    continue
+                slot = ordered_writer.slot(seq)
+                slot.write(cached_row)
+                slot.release()
+                if self.ledger:
+                    self.ledger.mark_done(medicare_id)
+        except Exception as e:
+            logging.error(f"Error reading MEDICARE IDs: {e}")
+        finally:
+            self.fed.set()
+
+    def _drained(self, id_queue):
+        """True once every ID has been queued and taken."""
+        return self.fed.is_set() and id_queue.empty()
+
+    def _login(self, worker_id):
+        """Start a logged-in session for one worker, retrying with a growing delay."""
+        session_file = self._session_file(worker_id)
+        profile = self.profile.for_worker(worker_id) if self.profile else None
+        for attempt in range(1, self.max_login_attempts + 1):
+            # A new session starts with the wait circuit breaker closed
+            wait_policy.reset_breaker()
+            timer.start_record(f"worker-{worker_id}", kind='login', worker=worker_id, attempt=attempt)
+            try:
+                driver = self.AutBot.start_session(self.eservices_url, self.headless, self.username, self.password,
+                                                   session_file, profile)
+                if driver:
+                    timer.finish_record('ok')
+                    return driver
+            except Exception as e:
+                logging.error(f"[worker-{worker_id}] Error during login: {e}")
+            timer.finish_record('failed')
+            logging.warning(f"[worker-{worker_id}] Login attempt {attempt} failed.")
+            time.sleep(5 * attempt)
+        return None
+
+    def _session_file(self, worker_id):
+        return f"session_state_{worker_id}.json" if self.session_state else None
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"Error closing browser session: {e}")
+
+    def _worker(self, worker_id, id_queue, ordered_writer):
+        driver, pipeline, health = None, None, SessionHealth(**self.health_limits)
+        setup_failures = 0
+        http = HttpInquiry() if self.http_fast_path else None
+
+        while not self._drained(id_queue):
+            # Recycle this worker's session only when its health signals say so
+            reason = health.recycle_reason(driver) if driver else None
+            if reason:
+                logging.info(f"[worker-{worker_id}] Recycling browser session after {health.handled} IDs: {reason}.")
+                self._quit(driver)
+                driver = None
+                # The saved cookies are dead once the portal has logged us out
+                if reason == 'login page reappeared':
+                    self.AutBot.discard_session_state(self._session_file(worker_id))
+            if driver is None:
+                # Log in once the first ID that needs a browser is queued: the login overlaps reading the rest of the
+                # input, but a run with nothing to scrape (all done or cached) never logs in or asks for an access code
+                while id_queue.empty() and not self.fed.wait(0.1):
+                    pass
+                if self._drained(id_queue):
+                    break
+                driver = self._login(worker_id)
+                health.reset(driver)
+                if driver is None:
+                    # IDs stay queued for the remaining workers
+                    logging.error(f"[worker-{worker_id}] Could not log in, stopping this worker.")
+                    return
+                try:
+                    if http:
+                        http.attach(driver, self.AutBot.HW)
+                    pipeline = TabPipeline(self, worker_id, driver, self.tabs) if self.tabs > 1 else None
+                except Exception as e:
+                    setup_failures += 1
+                    logging.error(f"[worker-{worker_id}] Error setting up the logged-in session: {e}")
+                    self._quit(driver)
+                    driver = None
+                    if setup_failures >= self.max_login_attempts:
+                        logging.error(f"[worker-{worker_id}] Session setup keeps failing, stopping this worker.")
+                        return
+                    continue
+                setup_failures = 0
+
+            if pipeline:
+                # Runs until the queue is drained or the session needs recycling
+                pipeline.run(id_queue, ordered_writer, http, health)
+                continue
+
+            try:
+                seq, medicare_id = id_queue.get(timeout=0.5)
+            except Empty:
+                # More IDs may still be on their way from the input
+                continue
+            job = self._start_id(worker_id, seq, medicare_id, ordered_writer)
+            try:
+                if not self._try_http(http, job):
+                    self.AutBot.Automation(driver, medicare_id, self.input_data_filename, job['slot'])
+                    job['status'] = 'browser'
+                self._finish_id(job, health)
+            except Exception as e:
+                self._finish_id(job, health, e)
+
+        if driver:
+            self._quit(driver)
+            logging.info(f"[worker-{worker_id}] Browser session closed.")
+
+    def _start_id(self, worker_id, seq, medicare_id, ordered_writer):
+        """Open the timing record, ledger claim and result slot for one ID."""
+        logging.info(f"[worker-{worker_id}] Scraping MEDICARE ID: {medicare_id}")
+        timer.start_record(medicare_id, kind='id', worker=worker_id)
+        if self.ledger:
+            self.ledger.claim(medicare_id)
+        return {'worker_id': worker_id, 'medicare_id': medicare_id, 'slot': ordered_writer.slot(seq),
+                'patient': self.AutBot.HW.get_patient(medicare_id, self.input_data_filename),
+                'status': 'error', 'started_at': time.monotonic()}
+
+    def _try_http(self, http, job):
+        """Answer the ID over the HTTP fast path if it is on; False means the browser must do it."""
+        if not (http and http.enabled and job['patient']):
+            return False
+        row = http.lookup(job['medicare_id'], job['patient'])
+        timer.lap('http.lookup')
+        if not row:
+            return False
+        job['slot'].write(row)
+        job['status'] = 'http'
+        return True
+
+    def _finish_id(self, job, health, error=None):
+        """Record one ID's outcome in the session health, ledger, cache and timing record."""
+        medicare_id, slot = job['medicare_id'], job['slot']
+        try:
+            if error is None:
+                health.record(succeeded=True)
+                if self.ledger:
+                    self.ledger.mark_done(medicare_id)
+                if self.cache and slot.row:
+                    self.cache.put(slot.row)
+            else:
+                health.record(succeeded=False)
+                logging.error(f"[worker-{job['worker_id']}] Error during automation: {error}")
+                # A row written before the error must not reach the output, where it would shadow the retry's row
+                slot.discard()
+                if self.ledger:
+                    self.ledger.mark_failed(medicare_id, error)
+        finally:
+            slot.release()
+            timer.finish_record(job['status'])
+            self.id_seconds.append(time.monotonic() - job['started_at'])
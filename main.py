@@ -1,56 +1,130 @@
 from Automation import AutomationBot
 from Helpers import HandyWrappers
+from ResultWriter import ResultWriter
+from WorkerPool import WorkerPool
+from Timing import timer
+from WaitPolicy import wait_policy
+from JobLedger import JobLedger
+from ResultCache import ResultCache
+from BrowserProfile import BrowserProfile
+import os
+import sys
+import json
 import logging
+import time
 # Set up logging configuration for better debugging and monitoring
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class Main():
     AutBot, HW = AutomationBot(), HandyWrappers()
 
-    def main(self, headless):
-        # Credentials & files
-        eservices_url = 'https://www.onlineproviderservices.com/ecx_improvev2/'
-        username = input('Enter username: ')
-        password = input('Enter password: ')
-        input_data_filename, output_data_filename = 'Tracking_IDs.xlsx', 'ELG_DATA_Output.xlsx'
+    def main(self, headless=True, workers=1, tabs=1, http_fast_path=False, lean=True, eservices_url='https://www.onlineproviderservices.com/ecx_improvev2/',
+             username=None, password=None, input_data_filename='Tracking_IDs.xlsx', output_data_filename='ELG_DATA_Output.xlsx',
+             cache_filename='eligibility_cache.sqlite', cache_ttls=None, wait_budgets_filename='wait_budgets.json',
+             credentials_filename='credentials.json'):
+        # Credentials are settled before anything launches, so a run never stops at a prompt halfway through
+        username, password, self.AutBot.access_code = self.credentials(username, password, credentials_filename)
+        started_at = time.monotonic()
 
-        # Checking output excel file exists, if yes, then loading, otherwise, creating new one
-        logging.info(f"Checking if excel file {output_data_filename} exists or needs to be created.")
-        scraped_medicare_ids = self.HW.xlsx_creator(output_data_filename)
+        # Replay rows journaled by an interrupted run so they count as already scraped
+        result_writer = ResultWriter(output_data_filename)
+        result_writer.recover()
+
+        # Per-ID step timings go to a JSONL file next to the output; a summary table is logged at the end
+        timer.open(f"{os.path.splitext(output_data_filename)[0]}.metrics.jsonl")
+        wait_policy.load(wait_budgets_filename)
+
+        # Job ledger tracks every ID's status across runs; IDs already in the output count as done
+        ledger = JobLedger(f"{os.path.splitext(output_data_filename)[0]}.ledger.sqlite")
+        cache = ResultCache(cache_filename, ttls=cache_ttls)
+
+        # Scrape with a pool of logged-in browser sessions pulling from one shared queue; the browsers start
+        # while the feeder thread reads the output's done IDs and streams the input in
+        logging.info(f"Scraping MEDICARE IDs from {input_data_filename} with {workers} worker(s), {tabs} tab(s) each.")
+        # Lean launch profile blocks images, fonts, media and trackers, with one reusable disk cache per worker
+        profile = BrowserProfile(headless=headless, lean=lean, cache_dir='browser_cache')
+        pool = WorkerPool(self.AutBot, eservices_url, headless, username, password, input_data_filename,
+                          workers=workers, tabs=tabs, http_fast_path=http_fast_path, profile=profile)
+        pool.run(self.ids_to_scrape(input_data_filename, output_data_filename, ledger, cache, pool.cached_rows),
+                 result_writer, ledger, cache)
+        logging.info(f"{cache.hits} MEDICARE IDs served from the result cache.")
 
-        # Load new Medicare IDs from excel
-        logging.info(f"Loading Medicare IDs from {input_data_filename}")
+        # The input has been read in full by now; the patient index holds every valid ID
         new_medicare_ids = self.HW.excel_reader(input_data_filename)
 
-        ID_counter = 0
-        # Perform login of eServices
-        try: 
-            driver = self.AutBot.portal_login(eservices_url, headless, username, password)
-        except Exception as e: 
-            logging.error(f"Error during login: {e}")
-
-        for medicare_id in new_medicare_ids:
-            if scraped_medicare_ids is None or medicare_id not in scraped_medicare_ids:
-                # Restart browser after every 10 IDs
-                if ID_counter > 0 and ID_counter % 10 == 0:
-                    driver.quit()
-                    logging.info("Restarting browser session after processing 10 IDs.")
-                    driver = self.AutBot.portal_login(eservices_url, headless, username, password)
-
-                logging.info(f"Scraping MEDICARE ID: {medicare_id}")
-                # Perform Automation
-                try: 
-                    self.AutBot.Automation(driver, medicare_id, input_data_filename, output_data_filename)   
-                except Exception as e:
-                    logging.error(f"Error during automation: {e}")
-
-                ID_counter += 1
-
-        # Ensure browser is closed at the end
-        if driver:
-            driver.quit()
-            logging.info("Browser session closed. Scraping completed.")
-
-            
-test=Main()
-test.main(headless=False)
\ No newline at end of file
+        # Failed IDs (from this or an earlier run) get further passes once their backoff has elapsed
+        for retry_pass in range(1, ledger.max_attempts):
+            retry_ids, not_before = ledger.retryable(new_medicare_ids)
+            if not retry_ids:
+                break
+            wait = not_before - time.time()
+            logging.info(f"Retry pass {retry_pass}: {len(retry_ids)} failed MEDICARE IDs, starting in {max(wait, 0):.0f} s.")
+            if wait > 0:
+                time.sleep(wait)
+            pool.run(retry_ids, result_writer, ledger, cache)
+
+        given_up = ledger.given_up(new_medicare_ids)
+        for medicare_id, last_error in given_up:
+            logging.error(f"Gave up on MEDICARE ID {medicare_id} after {ledger.max_attempts} attempts: {last_error}")
+        if given_up:
+            logging.error(f"{len(given_up)} MEDICARE IDs were not scraped; the next run tries them again.")
+        logging.info(f"Scraping completed. Job ledger: {ledger.counts()}")
+        ledger.close()
+        cache.log_summary()
+        cache.close()
+
+        # Run summary, used by Benchmark.py
+        return {'scraped': len(pool.id_seconds), 'seconds': time.monotonic() - started_at, 'id_seconds': pool.id_seconds,
+                'cache_hits': cache.hits, 'cache_hit_rate': cache.hit_rate()}
+
+    def credentials(self, username, password, credentials_filename):
+        """Return (username, password, access code) from arguments, the environment or the credentials file.
+
+        Missing username or password is prompted for on a terminal and is an error otherwise. The access code
+        may stay None; it is then asked for at login unless today's code is already saved.
+        """
+        config = {}
+        if credentials_filename and os.path.exists(credentials_filename):
+            try:
+                with open(credentials_filename, 'r') as f:
+                    config = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                logging.warning(f"Error reading credentials file {credentials_filename}. Ignoring it.")
+
+        username = username or os.environ.get('ESERVICES_USERNAME') or config.get('username')
+        password = password or os.environ.get('ESERVICES_PASSWORD') or config.get('password')
+        access_code = os.environ.get('ESERVICES_ACCESS_CODE') or config.get('access_code')
+        if not (username and password):
+            # sys.stdin is None under pythonw and in some scheduled tasks
+            if not (sys.stdin is not None and sys.stdin.isatty()):
+                raise RuntimeError("No eServices credentials; set ESERVICES_USERNAME and ESERVICES_PASSWORD "
+                                   f"or put them in {credentials_filename}.")
+            username = username or input('Enter username: ')
+            password = password or input('Enter password: ')
+        return username, password, access_code
+
+    def ids_to_scrape(self, input_data_filename, output_data_filename, ledger, cache, cached_rows):
+        """Stream the input batch by batch, yielding IDs missing from the output; fresh cached rows go into cached_rows."""
+        # Checking output excel file exists, if yes, then reading its MEDICARE ID column, otherwise, creating new one
+        logging.info(f"Checking if excel file {output_data_filename} exists or needs to be created.")
+        scraped_medicare_ids = self.HW.xlsx_creator(output_data_filename) or set()
+
+        for batch in self.HW.iter_patient_index(input_data_filename):
+            ledger.sync(batch.keys(), scraped_medicare_ids)
+            pending = set(ledger.pending(batch.keys()))
+            for medicare_id, patient in batch.items():
+                if str(medicare_id) in scraped_medicare_ids:
+                    continue
+                # Fresh rows from earlier runs go to the output in input order without a browser
+                cached_row = cache.get(medicare_id, patient['dob'])
+                if cached_row:
+                    cached_rows[medicare_id] = cached_row
+                    yield medicare_id
+                elif medicare_id in pending:
+                    yield medicare_id
+
+
+if __name__ == '__main__':
+    test=Main()
+    # Batch runs are headless; the access code is typed into the console, not the browser
+    test.main(headless=True)
\ No newline at end of file
@@ -0,0 +1,39 @@
+import unittest
+from datetime import datetime
+import pandas as pd
+from Helpers import HandyWrappers
+
+
+class NormalizeDatesTest(unittest.TestCase):
+    def setUp(self):
+        self.HW = HandyWrappers()
+
+    def normalize(self, values):
+        return self.HW.normalize_dates(pd.Series(values, dtype=object))
+
+    def test_mixed_types(self):
+        values = [datetime(1950, 3, 4), pd.Timestamp('1961-12-31'), 18326, 18326.0, ' 01/02/1970 ', None, True]
+        self.assertEqual(self.normalize(values),
+                         ['03/04/1950', '12/31/1961', '03/04/1950', '03/04/1950', '01/02/1970', None, None])
+
+    def test_ambiguous_strings_follow_detected_format(self):
+        # 13/01/1970 only parses day first, so the column is read as DD/MM/YYYY throughout
+        self.assertEqual(self.normalize(['13/01/1970', '02/03/1970', '25/12/1980']),
+                         ['01/13/1970', '03/02/1970', '12/25/1980'])
+        # Ties keep MM/DD/YYYY
+        self.assertEqual(self.normalize(['02/03/1970']), ['02/03/1970'])
+
+    def test_other_formats_fill_in_after_detected_one(self):
+        self.assertEqual(self.normalize(['01/02/1970', '01/03/1970', '1980-05-06', 'not a date']),
+                         ['01/02/1970', '01/03/1970', '05/06/1980', None])
+
+    def test_out_of_range_values_become_none(self):
+        values = ['03/04/0195', '01/02/1950', '03/04/2950', 99999999, datetime(1, 1, 1), 20000]
+        self.assertEqual(self.normalize(values), [None, '01/02/1950', None, None, None, '10/03/1954'])
+
+    def test_out_of_range_only_column(self):
+        self.assertEqual(self.normalize(['03/04/2950']), [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import tempfile
+import os
+from openpyxl import load_workbook
+from ResultWriter import ResultWriter, OUTPUT_HEADERS
+from WorkerPool import WorkerPool
+from JobLedger import JobLedger, DONE
+
+
+class FakeDriver:
+    def execute_script(self, *args):
+        return None
+
+    def quit(self):
+        pass
+
+
+class FakeHW:
+    def get_patient(self, medicare_id, input_data_filename):
+        return {'name': 'JOHN DOE', 'dob': '01/01/1950'}
+
+
+class FlakyBot:
+    """Writes an UNKNOWN row and then fails on the first attempt; the retry gets MED B."""
+    HW = FakeHW()
+
+    def __init__(self):
+        self.attempts = 0
+
+    def start_session(self, *args):
+        return FakeDriver()
+
+    def discard_session_state(self, session_file):
+        pass
+
+    def Automation(self, driver, medicare_id, input_data_filename, result_writer):
+        self.attempts += 1
+        eligibility = 'UNKNOWN' if self.attempts == 1 else 'MED B'
+        result_writer.write({'MEDICARE ID': medicare_id, 'ELIGIBILITY': eligibility})
+        if self.attempts == 1:
+            raise RuntimeError('page went away')
+
+
+class CountingBot(FlakyBot):
+    def __init__(self):
+        super().__init__()
+        self.logins = 0
+
+    def start_session(self, *args):
+        self.logins += 1
+        return FakeDriver()
+
+
+class CachedRunTest(unittest.TestCase):
+    def test_cache_hits_are_written_in_order_without_logging_in(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            output = os.path.join(workdir, 'out.xlsx')
+            bot = CountingBot()
+            pool = WorkerPool(bot, 'url', True, 'user', 'pass', 'in.xlsx', workers=2, session_state=False)
+            pool.cached_rows = {f'ID{i}': {'MEDICARE ID': f'ID{i}', 'ELIGIBILITY': 'DEAD'} for i in range(50)}
+            pool.run([f'ID{i}' for i in range(50)], ResultWriter(output))
+
+            self.assertEqual(bot.logins, 0)
+            medicare_id = OUTPUT_HEADERS.index('MEDICARE ID')
+            rows = list(load_workbook(output).active.iter_rows(min_row=2, values_only=True))
+            self.assertEqual([row[medicare_id] for row in rows], [f'ID{i}' for i in range(50)])
+
+
+class FailedAttemptTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.workdir.name, 'out.xlsx')
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_retry_row_replaces_row_of_failed_attempt(self):
+        result_writer = ResultWriter(self.output)
+        ledger = JobLedger(os.path.join(self.workdir.name, 'out.ledger.sqlite'))
+        ledger.sync(['ID1'], set())
+        pool = WorkerPool(FlakyBot(), 'url', True, 'user', 'pass', 'in.xlsx', session_state=False)
+
+        pool.run(['ID1'], result_writer, ledger)
+        self.assertFalse(os.path.exists(self.output))
+        with open(result_writer.journal_filename) as f:
+            self.assertEqual(f.read(), '')
+
+        pool.run(['ID1'], result_writer, ledger)
+        ledger.close()
+        rows = list(load_workbook(self.output).active.iter_rows(values_only=True))
+        eligibility = OUTPUT_HEADERS.index('ELIGIBILITY')
+        self.assertEqual([row[eligibility] for row in rows[1:]], ['MED B'])
+
+    def test_done_id_missing_from_output_is_pending_again(self):
+        ledger = JobLedger(os.path.join(self.workdir.name, 'out.ledger.sqlite'))
+        ledger.sync(['ID1', 'ID2'], set())
+        ledger.mark_done('ID1')
+        ledger.mark_done('ID2')
+        ledger.sync(['ID1', 'ID2'], {'ID2'})
+        self.assertEqual(ledger.pending(['ID1', 'ID2']), ['ID1'])
+        self.assertEqual(ledger.status('ID2'), DONE)
+        ledger.close()
+
+    def test_ids_given_up_on_get_fresh_attempts_next_run(self):
+        db = os.path.join(self.workdir.name, 'out.ledger.sqlite')
+        ledger = JobLedger(db, max_attempts=2)
+        ledger.sync(['ID1'], set())
+        for _ in range(2):
+            ledger.claim('ID1')
+            ledger.mark_failed('ID1', 'portal down')
+        self.assertEqual(ledger.retryable(['ID1'])[0], [])
+        self.assertEqual(ledger.given_up(['ID1']), [('ID1', 'portal down')])
+        ledger.close()
+
+        ledger = JobLedger(db, max_attempts=2)
+        ledger.sync(['ID1'], set())
+        self.assertEqual(ledger.pending(['ID1']), ['ID1'])
+        self.assertEqual(ledger.given_up(['ID1']), [])
+        ledger.close()
+
+
+if __name__ == '__main__':
+    unittest.main()